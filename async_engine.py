@@ -0,0 +1,144 @@
+# async_engine.py
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import obd
+from diagnostics import LiveDataSession, connect_session, report_dtcs
+
+# Deadlines (seconds) for the individual stages of a session
+CONNECT_TIMEOUT = 45.0
+REQUEST_TIMEOUT = 5.0
+DTC_TIMEOUT = 15.0
+# Give up on the adapter after this many poll requests in a row miss their deadline
+MAX_CONSECUTIVE_TIMEOUTS = 3
+# How often the thread adapter checks the GUI's stop event
+STOP_POLL_INTERVAL = 0.02
+
+def _close_abandoned(future):
+    """Closes a connection whose connect finished after the user already pressed Stop."""
+    if not future.cancelled() and future.exception() is None:
+        connection = future.result()[0]
+        connection.close()
+
+class DiagnosticsEngine:
+    """Runs connect, live polling and the DTC scan as cancellable asyncio tasks.
+
+    Transports stay blocking; every call runs on a single I/O thread (so requests are
+    never interleaved on the adapter) and is awaited with a deadline. Stopping cancels
+    the await immediately, so Stop takes effect within the request in flight.
+    """
+    def __init__(self, config, callbacks, request_timeout=REQUEST_TIMEOUT):
+        self.config = config
+        self.callbacks = callbacks
+        self.request_timeout = request_timeout
+        self._executor = None
+        self._stage = None
+        self._stopping = False
+
+    async def _io(self, func, *args, timeout):
+        """Runs one blocking transport call on the I/O thread, with a deadline."""
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        return await asyncio.wait_for(future, timeout)
+
+    async def _connect(self):
+        future = self._executor.submit(connect_session, self.config)
+        try:
+            # shield() so cancelling the await doesn't cancel the connect itself
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), CONNECT_TIMEOUT)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # On the executor's own future, so the close still runs once the event loop is gone
+            future.add_done_callback(_close_abandoned)
+            raise
+
+    async def _poll(self, session):
+        timeouts = 0
+        # A replay reports disconnected once the recording runs out
+        while session.connection.is_connected():
+            due = session.next_due()
+            if not due:
+                await asyncio.sleep(session.time_until_next())
+                continue
+            try:
+                values = await self._io(session.poll, due, timeout=self.request_timeout)
+            except asyncio.TimeoutError:
+                timeouts += 1
+                if timeouts >= MAX_CONSECUTIVE_TIMEOUTS:
+                    raise ConnectionError("The adapter stopped responding.")
+                values = {}
+            else:
+                timeouts = 0
+            session.publish(due, values)
+
+    async def _run_stage(self, coro):
+        """Runs one stage as the current cancellable task. Returns None if it was stopped."""
+        self._stage = asyncio.ensure_future(coro)
+        try:
+            return await self._stage
+        except asyncio.CancelledError:
+            if not self._stopping:
+                raise
+            return None
+        finally:
+            self._stage = None
+
+    def stop(self):
+        """Cancels whatever stage is running. Must be called from the engine's event loop."""
+        self._stopping = True
+        if self._stage is not None:
+            self._stage.cancel()
+
+    async def run(self):
+        callbacks = self.callbacks
+        brand = self.config['brand']
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="obd-io")
+        connection = None
+        session = None
+        try:
+            callbacks['status'](f"Connecting to {brand} via {self.config['connection_mode']}...")
+            callbacks['output'](f"Attempting to connect... 🏍️\n", True)
+
+            connect_start = time.perf_counter()
+            result = await self._run_stage(self._connect())
+            if result is None:
+                callbacks['output']("Connection cancelled.\n", False)
+                return
+            connection, supported_pids, vin = result
+            connect_time = time.perf_counter() - connect_start
+
+            callbacks['status'](f"Connected to {brand} | Polling live data...")
+            callbacks['output'](f"✅ Successfully connected! ({connect_time:.2f} s)\n", True)
+
+            session = LiveDataSession(connection, callbacks, brand, supported_pids, connect_time, self.config, vin)
+            if not self._stopping:
+                await self._run_stage(self._poll(session))
+
+            session.report()
+            response = await self._io(connection.query, obd.commands.GET_DTC, timeout=DTC_TIMEOUT)
+            report_dtcs(response, callbacks)
+
+        except Exception as e:
+            message = str(e) or type(e).__name__
+            callbacks['output'](f"❌ ERROR: {message}\n", True)
+            callbacks['error']("Error", f"An error occurred: {message}")
+
+        finally:
+            if session:
+                session.close()
+            if connection:
+                # Queued behind any request still in flight; don't wait for it
+                self._executor.submit(connection.close)
+            self._executor.shutdown(wait=False)
+            callbacks['status']("Ready")
+            callbacks['reset_buttons']()
+
+async def _run_until_stopped(engine, stop_event):
+    session = asyncio.ensure_future(engine.run())
+    while not session.done():
+        if stop_event.is_set():
+            engine.stop()
+        await asyncio.wait({session}, timeout=STOP_POLL_INTERVAL)
+    await session
+
+def run_engine_thread(config, callbacks, stop_event):
+    """Drop-in replacement for run_diagnostics_thread: same arguments, same callbacks dict."""
+    asyncio.run(_run_until_stopped(DiagnosticsEngine(config, callbacks), stop_event))
@@ -0,0 +1,107 @@
+# bench_codec.py
+"""Benchmarks the channel codecs on simulator data: compression ratio and encode/decode MB/s.
+
+Every polled channel is generated at its poll rate (with a little timing jitter, as
+real polling has) and compressed per block with GORILLA (delta-of-delta + XOR) and
+QDELTA (quantized integer deltas), next to zlib over the raw columns for reference.
+MB/s is measured against the raw size (float64 time + float32 value per sample).
+Requires NumPy. Usage: py bench_codec.py [--minutes M] [--seed N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import zlib
+from diagnostics import build_commands
+from scheduler import DEFAULT_POLL_RATES
+from simulator import OBDSimulator
+from channel_codec import (ArchiveReader, ArchiveWriter, BLOCK_SAMPLES, CODEC_NAMES, TIME_RESOLUTION,
+                           decode_block, encode_block)
+from obd_pids import RESOLUTIONS
+
+# Standard deviation of the polling jitter added to the ideal timestamps (seconds)
+JITTER_S = 0.002
+
+def generate_channels(minutes, seed):
+    """{channel: (PID name, times, values)} for every polled channel at its own rate."""
+    gauge_commands, secondary_commands = build_commands()
+    rng = random.Random(seed)
+    channels = {}
+    for key, cmd in {**gauge_commands, **secondary_commands}.items():
+        rate = DEFAULT_POLL_RATES.get(key, 1.0)
+        n = int(minutes * 60 * rate)
+        data = OBDSimulator(seed=seed).generate(n, [cmd.name], interval=1.0 / rate)
+        times = [t + abs(rng.gauss(0, JITTER_S)) for t in data['t'].tolist()]
+        values = data[cmd.name].astype('float32').tolist()
+        channels[key] = (cmd.name, times, values)
+    return channels
+
+def measure(times, values, resolution):
+    """(codec names used, compressed bytes, encode s, decode s) for one channel."""
+    blocks, codecs = [], set()
+    start = time.perf_counter()
+    for i in range(0, len(times), BLOCK_SAMPLES):
+        ticks = [round(t / TIME_RESOLUTION) for t in times[i:i + BLOCK_SAMPLES]]
+        codec, payload = encode_block(ticks, values[i:i + BLOCK_SAMPLES], resolution)
+        blocks.append((codec, payload, len(ticks), ticks[0]))
+        codecs.add(CODEC_NAMES[codec])
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+    for codec, payload, count, first in blocks:
+        decode_block(codec, payload, count, first, resolution)
+    decoded = time.perf_counter() - start
+    return "+".join(sorted(codecs)), sum(len(b[1]) for b in blocks), encoded, decoded
+
+def zlib_size(times, values):
+    from array import array
+    return len(zlib.compress(array('d', times).tobytes() + array('f', values).tobytes(), 6))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=10.0, help="simulated ride length")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    channels = generate_channels(args.minutes, args.seed)
+
+    print(f"{args.minutes:g} min simulated ride, {sum(len(c[1]) for c in channels.values())} samples, "
+          f"{BLOCK_SAMPLES} samples/block, timestamps at {TIME_RESOLUTION * 1000:g} ms resolution")
+    print(f"{'channel':<24}{'codec':<20}{'ratio':>7}{'zlib':>7}{'enc MB/s':>10}{'dec MB/s':>10}")
+    totals = {}
+    for key, (pid, times, values) in channels.items():
+        raw = 12 * len(times)
+        z = zlib_size(times, values)
+        for label, resolution in (("gorilla", None), ("qdelta", RESOLUTIONS.get(pid))):
+            used, size, encoded, decoded = measure(times, values, resolution)
+            if label == "qdelta" and used != "qdelta":
+                used += " (fallback)"
+            print(f"{key:<24}{used:<20}{raw / size:>7.1f}{raw / z:>7.1f}{raw / encoded / 1e6:>10.2f}{raw / decoded / 1e6:>10.2f}")
+            total = totals.setdefault(label, [0, 0, 0.0, 0.0, 0])
+            total[0] += raw
+            total[1] += size
+            total[2] += encoded
+            total[3] += decoded
+            total[4] += z
+    for label, (raw, size, encoded, decoded, z) in totals.items():
+        print(f"{'all channels':<24}{label:<20}{raw / size:>7.1f}{raw / z:>7.1f}{raw / encoded / 1e6:>10.2f}{raw / decoded / 1e6:>10.2f}")
+
+    # Random access: decode one block of the busiest channel out of a full archive
+    path = os.path.join(tempfile.mkdtemp(prefix="codec-bench-"), "bench.obdz")
+    writer = ArchiveWriter(path, list(channels), {key: RESOLUTIONS[pid] for key, (pid, _, _) in channels.items()})
+    for key, (_, times, values) in channels.items():
+        writer.write(key, times, values)
+    writer.close()
+    reader = ArchiveReader(path)
+    busiest = max(reader.blocks, key=lambda name: len(reader.blocks[name]))
+    blocks = reader.blocks[busiest]
+    start = time.perf_counter()
+    for block in blocks[::-1]:
+        reader.read_block(block)
+    per_block = (time.perf_counter() - start) / len(blocks)
+    print(f"Archive {os.path.getsize(path)} bytes; random block of '{busiest}' decoded in {per_block * 1000:.2f} ms")
+    reader.close()
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench_dtc_index.py
+"""Compares import time, first-lookup time and RSS growth of dtc_database vs the compiled dtc_index.
+
+Each variant runs in a fresh interpreter so nothing is shared between them, once with
+cached bytecode (unmarshalling) and once with an empty pycache (parsing from source).
+Usage: py bench_dtc_index.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import py_compile
+import subprocess
+import sys
+import tempfile
+
+VARIANTS = {
+    'dtc_database (dict literal)': "from dtc_database import DTC_CODES",
+    'dtc_index (memory-mapped)': "from dtc_index import DTC_CODES",
+}
+
+PROBE = """
+import json, time
+def rss_kb():
+    try:
+        # Current resident set size (Linux)
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * {page_kb}
+    except OSError:
+        try:
+            import resource
+        except ImportError:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # peak, but better than nothing
+rss_before = rss_kb()
+start = time.perf_counter()
+{import_line}
+imported = time.perf_counter()
+DTC_CODES.get("P0301")
+looked_up = time.perf_counter()
+rss_after = rss_kb()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "lookup_ms": (looked_up - imported) * 1000,
+                  "rss_delta_kb": (rss_after - rss_before) if rss_before is not None else None}}))
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def run_variant(import_line, pycache_prefix=None):
+    page_kb = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+    command = [sys.executable]
+    if pycache_prefix:
+        # Point the bytecode cache at an empty directory so the module is compiled from source
+        command += ["-B", "-X", f"pycache_prefix={pycache_prefix}"]
+    command += ["-c", PROBE.format(import_line=import_line, page_kb=page_kb)]
+    output = subprocess.run(command, cwd=HERE, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def summarize(name, results):
+    import_ms = statistics.median(r["import_ms"] for r in results)
+    lookup_ms = statistics.median(r["lookup_ms"] for r in results)
+    rss = [r["rss_delta_kb"] for r in results if r["rss_delta_kb"] is not None]
+    rss_str = f"{statistics.median(rss) / 1024:6.2f} MB" if rss else "   n/a"
+    print(f"{name:<40} import {import_ms:7.2f} ms | first lookup {lookup_ms:7.3f} ms | RSS +{rss_str}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Make sure both modules have bytecode and the index file exists before timing
+    for module in ("dtc_database.py", "dtc_index.py"):
+        py_compile.compile(os.path.join(HERE, module), doraise=True)
+    run_variant(VARIANTS['dtc_index (memory-mapped)'])
+
+    for name, import_line in VARIANTS.items():
+        summarize(name + ", bytecode", [run_variant(import_line) for _ in range(args.runs)])
+    with tempfile.TemporaryDirectory() as empty_cache:
+        for name, import_line in VARIANTS.items():
+            summarize(name + ", from source", [run_variant(import_line, empty_cache) for _ in range(args.runs)])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_journal.py
+"""Benchmarks the session journal's fsync policies: sustained write throughput and loss window.
+
+For each policy, samples are written as fast as possible for a fixed time. The
+journal reports the most bytes and the longest time it left unsynced, which is
+what a power loss could take. The loss window is also given at the live polling
+rate (the sum of the scheduler's target rates), where byte limits take longer to fill.
+Usage: py bench_journal.py [--seconds S] [--dir DIRECTORY]
+"""
+import argparse
+import os
+import tempfile
+import time
+from scheduler import DEFAULT_POLL_RATES
+from session_journal import SampleJournal, SAMPLE_FRAME_SIZE, parse_policy
+
+POLICIES = ["always", "bytes:4096", "bytes:65536", "interval:0.1", "interval:1", "none"]
+CHANNELS = [name for name in DEFAULT_POLL_RATES if name != 'dtc']
+
+def run_policy(policy, seconds, directory):
+    path = os.path.join(directory, f"bench-{policy.replace(':', '-')}.wal")
+    journal = SampleJournal(path, {'channels': CHANNELS, 'recording': None}, policy)
+    count = len(CHANNELS)
+    n = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        # Check the clock every 64 samples so the loop measures the journal, not perf_counter
+        for _ in range(64):
+            journal.on_sample(CHANNELS[n % count], n * 0.001, 1000.0 + n % 500)
+            n += 1
+        if time.perf_counter() >= deadline:
+            break
+    journal.close()
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    os.remove(path)
+    return {'samples_per_s': n / elapsed, 'mb_per_s': size / elapsed / 1e6, 'syncs': journal.syncs,
+            'max_unsynced_bytes': journal.max_unsynced_bytes, 'max_unsynced_ms': journal.max_unsynced_seconds * 1000}
+
+def live_loss_window(policy, live_rate):
+    """Worst-case seconds of samples a power loss can take at the live polling rate."""
+    kind, limit = parse_policy(policy)
+    if kind == "always":
+        return "0 s (one sample)"
+    if kind == "bytes":
+        return f"{limit / SAMPLE_FRAME_SIZE / live_rate:.1f} s"
+    if kind == "interval":
+        # fsync happens on the first sample after the interval runs out
+        return f"{limit + 1 / live_rate:.2f} s"
+    return "OS writeback (typically up to 30 s)"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="write time per policy")
+    parser.add_argument("--dir", default=None, help="directory on the disk to test (default: temp dir)")
+    args = parser.parse_args()
+    live_rate = sum(rate for name, rate in DEFAULT_POLL_RATES.items() if name != 'dtc')
+
+    directory = args.dir or tempfile.mkdtemp(prefix="journal-bench-")
+    print(f"Journal fsync policies, {args.seconds:g} s each, in {directory} "
+          f"({SAMPLE_FRAME_SIZE} bytes/sample, live rate {live_rate:.0f} samples/s)")
+    print(f"{'policy':<14}{'samples/s':>12}{'MB/s':>8}{'fsyncs':>8}{'unsynced B':>12}{'unsynced ms':>14}  loss window at live rate")
+    for policy in POLICIES:
+        r = run_policy(policy, args.seconds, directory)
+        print(f"{policy:<14}{r['samples_per_s']:>12,.0f}{r['mb_per_s']:>8.2f}{r['syncs']:>8}"
+              f"{r['max_unsynced_bytes']:>12}{r['max_unsynced_ms']:>14.1f}  {live_loss_window(policy, live_rate)}")
+    if not args.dir:
+        os.rmdir(directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench_transport.py
+"""Compares python-obd and the raw ELM327 transport: connect time, queries/sec and CPU per query.
+
+Usage: py bench_transport.py [address] [--queries N] [--transports python-obd raw]
+The address defaults to the one in settings.ini.
+"""
+import argparse
+import time
+from collections import namedtuple
+from config_manager import load_settings
+from raw_elm327 import RawElm327
+
+POLLED_PIDS = ["RPM", "SPEED", "COOLANT_TEMP", "ENGINE_LOAD",
+               "INTAKE_PRESSURE", "INTAKE_TEMP", "CONTROL_MODULE_VOLTAGE"]
+
+# The raw transport only needs something with a .name, like the simulator
+Command = namedtuple('Command', ['name'])
+
+def open_transport(name, address):
+    if name == 'raw':
+        return RawElm327(address, timeout=30), [Command(pid) for pid in POLLED_PIDS]
+    import obd
+    return obd.OBD(address, fast=False, timeout=30), [obd.commands[pid] for pid in POLLED_PIDS]
+
+def run_benchmark(name, address, queries):
+    start = time.perf_counter()
+    connection, commands = open_transport(name, address)
+    connect_s = time.perf_counter() - start
+    if not connection.is_connected():
+        print(f"{name:>10}: could not connect to {address}")
+        return
+
+    nulls = 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for i in range(queries):
+        if connection.query(commands[i % len(commands)]).is_null():
+            nulls += 1
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    connection.close()
+
+    print(f"{name:>10}: connect {connect_s:6.2f} s | {queries / wall:8.1f} queries/s | "
+          f"{cpu / queries * 1e6:8.1f} us CPU/query | {nulls} null responses")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("address", nargs="?", default=None)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--transports", nargs="+", default=["python-obd", "raw"], choices=["python-obd", "raw"])
+    args = parser.parse_args()
+    address = args.address or load_settings().get('address')
+
+    for name in args.transports:
+        run_benchmark(name, address, args.queries)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+# channel_codec.py
+"""Compressed long-term storage for recorded channels.
+
+Each channel is cut into blocks of up to BLOCK_SAMPLES samples, compressed on
+their own so any block can be decoded without the others:
+
+  timestamps    delta-of-delta of integer ticks (TIME_RESOLUTION seconds), bucketed
+                as in Gorilla: one bit for "same interval as before", a few for jitter
+  values        GORILLA: XOR of each float32 with the previous one, storing only the
+                meaningful bits; or QDELTA: for PIDs with a known resolution (obd_pids.
+                RESOLUTIONS), integer steps of that resolution, delta-coded the same way
+                as the timestamps. QDELTA is used only when it reproduces every value exactly.
+
+An archive (.obdz) is a JSON header followed by the blocks, each behind a small
+header (channel, codec, count, size, time range, value range), so readers can skip
+to the blocks they need and decode them one at a time.
+
+Usage: py channel_codec.py recordings/session-....cols [-o archive.obdz]
+"""
+import argparse
+import json
+import os
+import struct
+from array import array
+from collections import namedtuple
+from obd_pids import RESOLUTIONS
+
+MAGIC = b"OBDZIP01"
+LENGTH = struct.Struct("<I")
+# channel, codec, count, payload bytes, first/last tick, min/max value
+BLOCK = struct.Struct("<HBxIIqqff")
+BLOCK_SAMPLES = 1024
+# Timestamps are stored as integer ticks of this many seconds
+TIME_RESOLUTION = 1e-4
+GORILLA, QDELTA = 1, 2
+CODEC_NAMES = {GORILLA: 'gorilla', QDELTA: 'qdelta'}
+
+FLOAT32 = struct.Struct("<f")
+UINT32 = struct.Struct("<I")
+# (prefix bits, prefix length, value bits) per bucket of a signed delta; zero takes the single bit "0"
+BUCKETS = [(0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12), (0b11110, 5, 20), (0b11111, 5, 64)]
+
+BlockInfo = namedtuple('BlockInfo', ['offset', 'channel', 'codec', 'count', 'size', 't_first', 't_last', 'v_min', 'v_max'])
+
+def _float32_bits(value):
+    return UINT32.unpack(FLOAT32.pack(value))[0]
+
+def _bits_float32(bits):
+    return FLOAT32.unpack(UINT32.pack(bits))[0]
+
+class BitWriter:
+    """Appends bit fields MSB-first, moving whole bytes out of the accumulator as it fills."""
+    def __init__(self):
+        self.out = bytearray()
+        self.acc = 0
+        self.nbits = 0
+
+    def write(self, value, n):
+        self.acc = (self.acc << n) | (value & ((1 << n) - 1))
+        self.nbits += n
+        if self.nbits >= 64:
+            rest = self.nbits & 7
+            self.out += (self.acc >> rest).to_bytes(self.nbits >> 3, 'big')
+            self.acc &= (1 << rest) - 1
+            self.nbits = rest
+
+    def getvalue(self):
+        pad = -self.nbits % 8
+        return bytes(self.out) + (self.acc << pad).to_bytes((self.nbits + pad) >> 3, 'big')
+
+class BitReader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, n):
+        pos = self.pos
+        end = (pos + n + 7) >> 3
+        chunk = int.from_bytes(self.data[pos >> 3:end], 'big')
+        self.pos = pos + n
+        return (chunk >> ((end << 3) - pos - n)) & ((1 << n) - 1)
+
+    def read_bit(self):
+        pos = self.pos
+        self.pos = pos + 1
+        return (self.data[pos >> 3] >> (7 - (pos & 7))) & 1
+
+def _write_signed(writer, value):
+    """Writes a signed integer in the smallest bucket that holds it."""
+    if value == 0:
+        writer.write(0, 1)
+        return
+    for prefix, prefix_bits, bits in BUCKETS:
+        if -(1 << (bits - 1)) <= value < (1 << (bits - 1)):
+            writer.write(prefix, prefix_bits)
+            writer.write(value, bits)
+            return
+    raise ValueError(f"{value} doesn't fit in 64 bits")
+
+def _read_signed(reader):
+    if not reader.read_bit():
+        return 0
+    # The prefix is 1-4 ones ended by a zero, or five ones
+    ones = 1
+    while ones < len(BUCKETS) and reader.read_bit():
+        ones += 1
+    bits = BUCKETS[ones - 1][2]
+    value = reader.read(bits)
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+def _encode_times(writer, ticks):
+    previous, delta = ticks[0], 0
+    for tick in ticks[1:]:
+        new_delta = tick - previous
+        _write_signed(writer, new_delta - delta)
+        previous, delta = tick, new_delta
+
+def _decode_times(reader, first, count):
+    ticks = [first]
+    previous, delta = first, 0
+    for _ in range(count - 1):
+        delta += _read_signed(reader)
+        previous += delta
+        ticks.append(previous)
+    return ticks
+
+def _encode_gorilla(writer, values):
+    previous = _float32_bits(values[0])
+    writer.write(previous, 32)
+    leading, meaningful = 33, 0  # no window yet
+    for value in values[1:]:
+        bits = _float32_bits(value)
+        xor = bits ^ previous
+        previous = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        new_leading = 32 - xor.bit_length()
+        new_trailing = (xor & -xor).bit_length() - 1
+        if new_leading >= leading and new_trailing >= 32 - leading - meaningful:
+            # Fits the previous window of meaningful bits
+            writer.write(0b10, 2)
+            writer.write(xor >> (32 - leading - meaningful), meaningful)
+        else:
+            leading, meaningful = new_leading, 32 - new_leading - new_trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            writer.write(meaningful - 1, 5)
+            writer.write(xor >> new_trailing, meaningful)
+
+def _decode_gorilla(reader, count):
+    previous = reader.read(32)
+    values = array('f', [_bits_float32(previous)])
+    leading = meaningful = 0
+    for _ in range(count - 1):
+        if reader.read_bit():
+            if reader.read_bit():
+                leading = reader.read(5)
+                meaningful = reader.read(5) + 1
+            previous ^= reader.read(meaningful) << (32 - leading - meaningful)
+        values.append(_bits_float32(previous))
+    return values
+
+def _quantize(values, resolution):
+    """Integer steps of `resolution` for every value, or None if that wouldn't be exact in float32."""
+    steps = []
+    for value in values:
+        step = round(value / resolution)
+        if FLOAT32.pack(step * resolution) != FLOAT32.pack(value):
+            return None
+        steps.append(step)
+    return steps
+
+def encode_block(ticks, values, resolution=None):
+    """Compresses one block: integer tick timestamps and float values. Returns (codec, payload)."""
+    writer = BitWriter()
+    _encode_times(writer, ticks)
+    steps = _quantize(values, resolution) if resolution else None
+    if steps is None:
+        _encode_gorilla(writer, values)
+        return GORILLA, writer.getvalue()
+    _write_signed(writer, steps[0])
+    for previous, step in zip(steps, steps[1:]):
+        _write_signed(writer, step - previous)
+    return QDELTA, writer.getvalue()
+
+def decode_block(codec, payload, count, first_tick, resolution=None):
+    """Decompresses one block into (ticks, float32 values)."""
+    reader = BitReader(payload)
+    ticks = _decode_times(reader, first_tick, count)
+    if codec == GORILLA:
+        return ticks, _decode_gorilla(reader, count)
+    step = _read_signed(reader)
+    values = array('f', [step * resolution])
+    for _ in range(count - 1):
+        step += _read_signed(reader)
+        values.append(step * resolution)
+    return ticks, values
+
+class ArchiveWriter:
+    """Writes channels block by block into an archive. `resolutions` maps channels to their PID resolution."""
+    def __init__(self, path, channels, resolutions=None, time_resolution=TIME_RESOLUTION, **metadata):
+        self.channels = list(channels)
+        self.ids = {name: i for i, name in enumerate(self.channels)}
+        self.resolutions = resolutions or {}
+        self.time_resolution = time_resolution
+        header = json.dumps({'channels': self.channels, 'resolutions': self.resolutions,
+                             'time_resolution': time_resolution, **metadata}).encode('utf-8')
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + LENGTH.pack(len(header)) + header)
+        self.raw_bytes = 0
+        self.blocks = 0
+
+    def write(self, channel, times, values):
+        """Adds samples of one channel (times in seconds), in as many blocks as needed."""
+        i = self.ids[channel]
+        resolution = self.resolutions.get(channel)
+        scale = 1.0 / self.time_resolution
+        for start in range(0, len(times), BLOCK_SAMPLES):
+            ticks = [round(t * scale) for t in times[start:start + BLOCK_SAMPLES]]
+            block = [float(v) for v in values[start:start + BLOCK_SAMPLES]]
+            codec, payload = encode_block(ticks, block, resolution)
+            self._file.write(BLOCK.pack(i, codec, len(ticks), len(payload), ticks[0], ticks[-1], min(block), max(block)))
+            self._file.write(payload)
+            self.raw_bytes += 12 * len(ticks)  # float64 time + float32 value
+            self.blocks += 1
+
+    def close(self):
+        self._file.close()
+
+class ArchiveReader:
+    """Random access to an archive's blocks; decoding happens one block at a time."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a channel archive.")
+        (length,) = LENGTH.unpack(self._file.read(LENGTH.size))
+        self.header = json.loads(self._file.read(length))
+        self.channels = self.header['channels']
+        self.resolutions = self.header.get('resolutions', {})
+        self.time_resolution = self.header['time_resolution']
+        self.blocks = {name: [] for name in self.channels}
+        self._scan(len(MAGIC) + LENGTH.size + length)
+
+    def _scan(self, offset):
+        """Reads the block headers only, seeking over the payloads; stops at a torn final block."""
+        size = os.fstat(self._file.fileno()).st_size
+        while offset + BLOCK.size <= size:
+            self._file.seek(offset)
+            info = BlockInfo(offset, *BLOCK.unpack(self._file.read(BLOCK.size)))
+            if info.channel >= len(self.channels) or offset + BLOCK.size + info.size > size:
+                break
+            self.blocks[self.channels[info.channel]].append(info)
+            offset += BLOCK.size + info.size
+
+    def read_block(self, block):
+        """(times in seconds, float32 values) of one block."""
+        self._file.seek(block.offset + BLOCK.size)
+        ticks, values = decode_block(block.codec, self._file.read(block.size), block.count, block.t_first,
+                                     self.resolutions.get(self.channels[block.channel]))
+        return array('d', [tick * self.time_resolution for tick in ticks]), values
+
+    def iter_blocks(self, channel, start=None, end=None):
+        """Yields decoded (times, values) block by block, skipping blocks outside [start, end] seconds."""
+        scale = 1.0 / self.time_resolution
+        for block in self.blocks[channel]:
+            if start is not None and block.t_last < start * scale:
+                continue
+            if end is not None and block.t_first > end * scale:
+                break
+            yield self.read_block(block)
+
+    def channel(self, name, start=None, end=None):
+        """All samples of one channel within [start, end] seconds, as (array('d'), array('f'))."""
+        times, values = array('d'), array('f')
+        for block_times, block_values in self.iter_blocks(name, start, end):
+            for t, v in zip(block_times, block_values):
+                if (start is None or t >= start) and (end is None or t <= end):
+                    times.append(t)
+                    values.append(v)
+        return times, values
+
+    def close(self):
+        self._file.close()
+
+def channel_resolutions(channels):
+    """PID resolutions for the GUI's channel keys (rpm, 'Intake Pressure (kPa)', ...)."""
+    from diagnostics import build_commands
+    gauge_commands, secondary_commands = build_commands()
+    commands = {**gauge_commands, **secondary_commands}
+    return {name: RESOLUTIONS[commands[name].name] for name in channels
+            if name in commands and commands[name].name in RESOLUTIONS}
+
+def archive_recording(path, out_path=None):
+    """Compresses a column recording (.cols) into an archive. Returns (archive path, raw bytes, archive bytes)."""
+    from column_recorder import ColumnReader
+    reader = ColumnReader(path)
+    out_path = out_path or os.path.splitext(path)[0] + ".obdz"
+    metadata = {key: value for key, value in reader.header.items() if key != 'channels'}
+    writer = ArchiveWriter(out_path, reader.channels, channel_resolutions(reader.channels), **metadata)
+    for name in reader.channels:
+        times, values = reader.channel(name)
+        writer.write(name, times.tolist(), values.tolist())
+    writer.close()
+    return out_path, writer.raw_bytes, os.path.getsize(out_path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="column recording (.cols) to compress")
+    parser.add_argument("-o", "--output", default=None, help="archive path (default: next to the recording)")
+    args = parser.parse_args()
+    out_path, raw, size = archive_recording(args.recording, args.output)
+    print(f"{out_path}: {raw} -> {size} bytes ({raw / max(size, 1):.1f}x)")
+
+if __name__ == "__main__":
+    main()
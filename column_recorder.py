@@ -0,0 +1,177 @@
+# column_recorder.py
+"""Columnar binary recording of the live sample stream.
+
+File layout (little-endian, every section starts on an 8-byte boundary):
+
+  file header   MAGIC, uint32 length, JSON metadata (channels, start time, brand, VIN)
+  blocks        each holds one channel: a BLOCK header (channel number, sample count,
+                first/last timestamp, min/max value), then `count` float64 monotonic
+                timestamps, then `count` float32 values
+
+Samples are buffered per channel in preallocated arrays and written a block at a
+time, batched into few large writes. ColumnReader memory-maps a file and hands out
+the columns as NumPy arrays without parsing them.
+"""
+import json
+import struct
+import time
+from array import array
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"OBDCOL01"
+LENGTH = struct.Struct("<I")
+BLOCK_MAGIC = b"BLK1"
+# magic, channel, count, first t, last t, min value, max value (+ padding to 40 bytes)
+BLOCK = struct.Struct("<4sHxxIddff4x")
+# Samples per block, per channel
+BLOCK_SAMPLES = 1024
+# Write buffered blocks once this many bytes are waiting...
+FLUSH_BYTES = 64 * 1024
+# ...or, sealing partly filled blocks, when this many seconds have passed
+FLUSH_INTERVAL = 10.0
+
+BlockInfo = namedtuple('BlockInfo', ['offset', 'count', 't_first', 't_last', 'v_min', 'v_max'])
+
+def _padding(length):
+    return b"\0" * (-length % 8)
+
+class ColumnRecorder:
+    """Sample sink writing (monotonic time, float32 value) columns per channel.
+
+    `on_sample` is O(1) and allocation-free until a block fills up; the file is
+    written in batches of at least `flush_bytes` or every `flush_interval` seconds.
+    """
+    def __init__(self, path, channels, block_samples=BLOCK_SAMPLES, flush_bytes=FLUSH_BYTES,
+                 flush_interval=FLUSH_INTERVAL, clock=time.monotonic, **metadata):
+        self.path = path
+        self.channels = list(channels)
+        self.ids = {name: i for i, name in enumerate(self.channels)}
+        self.block_samples = block_samples
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._times = [array('d', bytes(8 * block_samples)) for _ in self.channels]
+        self._values = [array('f', bytes(4 * block_samples)) for _ in self.channels]
+        self._counts = [0] * len(self.channels)
+        self._pending = bytearray()
+        self.samples = 0
+        self.blocks = 0
+
+        self.header = {'channels': self.channels, 'started': time.time(), 'started_monotonic': clock(), **metadata}
+        header = json.dumps(self.header).encode('utf-8')
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + LENGTH.pack(len(header)) + header + _padding(len(MAGIC) + LENGTH.size + len(header)))
+        self._next_flush = clock() + flush_interval
+
+    def on_sample(self, channel, t, value):
+        i = self.ids.get(channel)
+        if i is None:
+            return
+        n = self._counts[i]
+        self._times[i][n] = t
+        self._values[i][n] = value
+        self._counts[i] = n + 1
+        self.samples += 1
+        if n + 1 == self.block_samples:
+            self._seal(i)
+            if len(self._pending) >= self.flush_bytes:
+                self._write()
+        if t >= self._next_flush:
+            self.flush()
+            self._next_flush = t + self.flush_interval
+
+    def _seal(self, i):
+        """Moves channel i's buffered samples into the pending bytes as one block."""
+        n = self._counts[i]
+        times = self._times[i][:n]
+        values = self._values[i][:n]
+        self._pending += BLOCK.pack(BLOCK_MAGIC, i, n, times[0], times[-1], min(values), max(values))
+        self._pending += times.tobytes()
+        self._pending += values.tobytes()
+        self._pending += _padding(4 * n)
+        self._counts[i] = 0
+        self.blocks += 1
+
+    def _write(self):
+        self._file.write(self._pending)
+        self._pending.clear()
+
+    def flush(self):
+        """Writes everything buffered, including partly filled blocks."""
+        for i, n in enumerate(self._counts):
+            if n:
+                self._seal(i)
+        if self._pending:
+            self._write()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+class ColumnReader:
+    """Memory-maps a column recording; columns come back as NumPy arrays. Requires NumPy."""
+    def __init__(self, path):
+        if np is None:
+            raise RuntimeError("ColumnReader requires NumPy (pip install numpy).")
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self.data[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a column recording.")
+        (length,) = LENGTH.unpack_from(self.data, len(MAGIC))
+        start = len(MAGIC) + LENGTH.size
+        self.header = json.loads(bytes(self.data[start:start + length]))
+        self.channels = self.header['channels']
+        self.blocks = {name: [] for name in self.channels}
+        self._scan(start + length + (-(start + length) % 8))
+
+    def _scan(self, offset):
+        """Walks the block headers only; stops at a torn final block."""
+        size = len(self.data)
+        while offset + BLOCK.size <= size:
+            magic, channel, count, t_first, t_last, v_min, v_max = BLOCK.unpack_from(self.data, offset)
+            end = offset + BLOCK.size + 12 * count + (-(4 * count) % 8)
+            if magic != BLOCK_MAGIC or channel >= len(self.channels) or end > size:
+                break
+            self.blocks[self.channels[channel]].append(BlockInfo(offset, count, t_first, t_last, v_min, v_max))
+            offset = end
+
+    def _columns(self, block):
+        times_at = block.offset + BLOCK.size
+        values_at = times_at + 8 * block.count
+        return (self.data[times_at:values_at].view('<f8'),
+                self.data[values_at:values_at + 4 * block.count].view('<f4'))
+
+    def channel(self, name, start=None, end=None):
+        """(timestamps, values) of one channel, optionally limited to start <= t <= end.
+
+        Blocks outside the range are skipped using their headers. A single block is
+        returned as views into the mapped file; several are concatenated.
+        """
+        blocks = [block for block in self.blocks[name]
+                  if (start is None or block.t_last >= start) and (end is None or block.t_first <= end)]
+        if not blocks:
+            return np.empty(0, dtype='<f8'), np.empty(0, dtype='<f4')
+        columns = [self._columns(block) for block in blocks]
+        if len(columns) == 1:
+            times, values = columns[0]
+        else:
+            times = np.concatenate([c[0] for c in columns])
+            values = np.concatenate([c[1] for c in columns])
+        if start is not None or end is not None:
+            keep = (times >= (-np.inf if start is None else start)) & (times <= (np.inf if end is None else end))
+            times, values = times[keep], values[keep]
+        return times, values
+
+    def stats(self, name):
+        """(count, min, max) of a channel from the block headers alone."""
+        blocks = self.blocks[name]
+        if not blocks:
+            return 0, None, None
+        return (sum(block.count for block in blocks),
+                min(block.v_min for block in blocks), max(block.v_max for block in blocks))
@@ -9,12 +9,31 @@ def load_settings():
     # Provide default values
     config['DEFAULT'] = {
         'connection_mode': 'Simulator',
-        'address': 'tcp://192.168.0.10:35000'
+        'address': 'tcp://192.168.0.10:35000',
+        'transport': 'python-obd',  # or 'raw' for the lightweight ELM327 transport
+        'ui_fps': '30',  # how often the GUI applies updates from the diagnostics thread
+        'gauge_damping': '0.75',  # 0 = needle jumps to each sample, closer to 1 = smoother
+        'pause_gauges_unfocused': 'yes',
+        'dtc_backend': 'index',  # or 'sqlite' for the SQLite FTS5 store
+        'sim_seed': '',  # a number replays the same simulated ride; empty = a new one each time
+        'sim_link_profile': 'ideal',  # ideal, usb-ftdi, bt-classic or wifi-cheap-clone
+        'record_sessions': 'yes',  # write each live session's traffic to recordings/
+        'recordings_keep': '20',  # newest recordings of each kind kept in recordings/; 0 = keep all
+        'record_columns': 'yes',  # write each session's sensor values to recordings/*.cols
+        'journal_sessions': 'yes',  # with record_columns: journal the values so a crash doesn't lose them
+        'journal_fsync': 'interval:1',  # always, bytes:N, interval:SECONDS or none
+        'replay_file': '',  # recording played back in Replay mode
+        'replay_speed': '1',  # 1 = real time, N = N times faster, 0 = as fast as possible
+        'freeze_frames': 'yes',  # capture freeze frames when a new DTC (or a trigger below) appears
+        'freeze_log_keep': '500',  # newest freeze frames kept in freeze_frame_log.jsonl; 0 = keep all
+        'freeze_pre_seconds': '10',  # history kept before the trigger
+        'freeze_post_seconds': '5',  # recording continued after it
+        'freeze_triggers': ''  # extra triggers, e.g. temp>105, rpm>9000
     }
     
     if not config.read(CONFIG_FILE):
         # If the file doesn't exist, create it with defaults
-        save_settings({'connection_mode': 'Simulator', 'address': 'tcp://192.168.0.10:35000'})
+        save_settings(dict(config['DEFAULT']))
         print("Settings file not found, creating with default values.")
 
     # Read the actual settings from the [OBD] section
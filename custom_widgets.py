@@ -1,6 +1,10 @@
 # custom_widgets.py
 import customtkinter
 import math
+import time
+
+# The needle snaps to its target once it is closer than this fraction of the scale
+SNAP_FRACTION = 0.002
 
 class Gauge(customtkinter.CTkFrame):
     def __init__(self, *args,
@@ -10,6 +14,9 @@ class Gauge(customtkinter.CTkFrame):
                  unit: str = "",
                  width: int = 250, # Slightly wider for better spacing
                  height: int = 250,
+                 frame_rate: float = 30,
+                 damping: float = 0.75,
+                 pause_when_unfocused: bool = True,
                  **kwargs):
         super().__init__(*args, width=width, height=height, **kwargs)
 
@@ -29,23 +36,81 @@ class Gauge(customtkinter.CTkFrame):
         self.label = customtkinter.CTkLabel(self, text=self.label_text, font=("Arial", 14, "bold"))
         self.label.pack(pady=(5, 10)) # Pack the label below the canvas
         
+        # Geometry (center, radius) is cached until the canvas is resized
+        self._geometry = None
+        # Canvas ids of the needle, arc etc., created once and then only moved
+        self._dynamic_items = None
+        # (needle end pixel, displayed integer) of what's currently drawn
+        self._drawn_key = None
+        self._value = self.min_value
+        self.canvas.bind("<Configure>", self._on_configure)
+
+        # Samples only set the target; the render loop eases the needle toward it
+        # once per frame, so the sample rate and the frame rate are independent
+        self.frame_ms = max(1, int(1000 / frame_rate))
+        self.damping = min(max(damping, 0.0), 0.99) # Fraction of the gap left after each frame
+        self.pause_when_unfocused = pause_when_unfocused
+        self._target = float(self.min_value)
+        self._displayed = float(self.min_value)
+
         # We need to wait for the window to be drawn to get accurate dimensions
         self.after(100, self.initialize_gauge)
 
     def initialize_gauge(self):
         """Draws the gauge for the first time after the window is created."""
         self.draw_static_elements()
-        self.update_value(self.min_value)
+        self.update_value(self._value)
+        self.after(self.frame_ms, self._render_frame)
+
+    def set_target(self, value):
+        """Records the latest sample. Safe to call from any thread; never touches Tk."""
+        try: self._target = float(value)
+        except (ValueError, TypeError): pass
+
+    def _should_render(self):
+        """Frames are skipped while the window is minimized, hidden or (optionally) unfocused."""
+        if self.winfo_toplevel().state() == "iconic" or not self.winfo_viewable():
+            return False
+        return not (self.pause_when_unfocused and self.focus_displayof() is None)
+
+    def _render_frame(self):
+        start = time.perf_counter()
+        if self._should_render():
+            target = max(self.min_value, min(self.max_value, self._target))
+            gap = target - self._displayed
+            if abs(gap) <= (self.max_value - self.min_value) * SNAP_FRACTION:
+                self._displayed = target
+            else:
+                self._displayed += gap * (1.0 - self.damping)
+            self.update_value(self._displayed)
+        # Keep a steady frame rate: the next frame is due one budget after this one started
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        self.after(max(1, self.frame_ms - elapsed_ms), self._render_frame)
+
+    def _on_configure(self, event=None):
+        """The canvas was resized: recompute the geometry and redraw everything once."""
+        self._geometry = None
+        if self._dynamic_items is not None:
+            self.draw_static_elements()
+            self._drawn_key = None
+            self.update_value(self._value)
+
+    def _get_geometry(self):
+        if self._geometry is None:
+            w = self.canvas.winfo_width()
+            h = self.canvas.winfo_height()
+            center_x, center_y = w / 2, h * 0.9 # Center drawing lower in the canvas
+            radius = min(center_x, center_y) * 0.9
+            self._geometry = (center_x, center_y, radius)
+        return self._geometry
 
     def draw_static_elements(self):
-        w = self.canvas.winfo_width()
-        h = self.canvas.winfo_height()
-        center_x, center_y = w / 2, h * 0.9 # Center drawing lower in the canvas
-        radius = min(center_x, center_y) * 0.9
+        center_x, center_y, radius = self._get_geometry()
+        self.canvas.delete("static")
 
         # Draw arcs
         self.canvas.create_arc(center_x - radius, center_y - radius, center_x + radius, center_y + radius,
-                               start=150, extent=240, style="arc", width=15, outline="#555555")
+                               start=150, extent=240, style="arc", width=15, outline="#555555", tags="static")
         
         # Draw tick marks and labels
         for i in range(11):
@@ -55,38 +120,60 @@ class Gauge(customtkinter.CTkFrame):
             y1 = center_y - radius * math.sin(rad)
             x2 = center_x + radius * 0.9 * math.cos(rad)
             y2 = center_y - radius * 0.9 * math.sin(rad)
-            self.canvas.create_line(x1, y1, x2, y2, fill="#11c900", width=2)
+            self.canvas.create_line(x1, y1, x2, y2, fill="#11c900", width=2, tags="static")
             if i % 2 == 0:
                 val = self.min_value + (self.max_value - self.min_value) * (i / 10)
                 x_text = center_x + radius * 0.7 * math.cos(rad)
                 y_text = center_y - radius * 0.7 * math.sin(rad)
-                self.canvas.create_text(x_text, y_text, text=f"{int(val/1000)}k" if val >= 1000 else str(int(val)), fill="#11c900", font=("Arial", 10))
+                self.canvas.create_text(x_text, y_text, text=f"{int(val/1000)}k" if val >= 1000 else str(int(val)), fill="#11c900", font=("Arial", 10), tags="static")
+
+        if self._dynamic_items is None:
+            self._create_dynamic_items()
+        else:
+            # Keep the needle and readout above the freshly drawn dial
+            self.canvas.tag_raise("dynamic")
+
+    def _create_dynamic_items(self):
+        """Creates the needle, value arc and readout once; update_value only moves them."""
+        self._dynamic_items = {
+            'arc': self.canvas.create_arc(0, 0, 0, 0, start=150, extent=0, style="arc", width=15, outline="#11c900", tags="dynamic"),
+            'needle': self.canvas.create_line(0, 0, 0, 0, fill="#d32d21", width=3, tags="dynamic"),
+            'hub': self.canvas.create_oval(0, 0, 0, 0, fill="#d32d21", outline="white", tags="dynamic"),
+            'value': self.canvas.create_text(0, 0, text="", fill="#11c900", font=("Arial", 30, "bold"), tags="dynamic"),
+            'unit': self.canvas.create_text(0, 0, text=self.unit, fill="#11c900", font=("Arial", 12), tags="dynamic"),
+        }
 
     def update_value(self, value):
-        w = self.canvas.winfo_width()
-        h = self.canvas.winfo_height()
-        center_x, center_y = w / 2, h * 0.9
-        radius = min(center_x, center_y) * 0.9
-        
         try: numeric_value = float(value)
         except (ValueError, TypeError): numeric_value = self.min_value
         
         clamped_value = max(self.min_value, min(self.max_value, numeric_value))
+        self._value = clamped_value
+        if self._dynamic_items is None:
+            return  # Not drawn yet; initialize_gauge will show the latest value
 
-        self.canvas.delete("dynamic")
-        
+        center_x, center_y, radius = self._get_geometry()
         percent = (clamped_value - self.min_value) / (self.max_value - self.min_value)
-        angle_extent = percent * 240
-        self.canvas.create_arc(center_x - radius, center_y - radius, center_x + radius, center_y + radius,
-                               start=150, extent=-angle_extent, style="arc", width=15, outline="#11c900", tags="dynamic")
-        
         angle = 210 - (percent * 240)
         rad = math.radians(angle)
         x_end = center_x + radius * 0.85 * math.cos(rad)
         y_end = center_y - radius * 0.85 * math.sin(rad)
-        self.canvas.create_line(center_x, center_y, x_end, y_end, fill="#d32d21", width=3, tags="dynamic")
-        self.canvas.create_oval(center_x - 5, center_y - 5, center_x + 5, center_y + 5, fill="#d32d21", outline="white", tags="dynamic")
-        
-        # FIX: Centered the text elements on the canvas
-        self.canvas.create_text(center_x, center_y - 20, text=str(int(clamped_value)), fill="#11c900", font=("Arial", 30, "bold"), tags="dynamic")
-        self.canvas.create_text(center_x, center_y + 10, text=self.unit, fill="#11c900", font=("Arial", 12), tags="dynamic")
\ No newline at end of file
+
+        # Skip the redraw when nothing visible would change
+        key = (round(x_end), round(y_end), int(clamped_value))
+        if key == self._drawn_key:
+            return
+        first_draw = self._drawn_key is None
+        self._drawn_key = key
+
+        items = self._dynamic_items
+        self.canvas.itemconfigure(items['arc'], extent=-(percent * 240))
+        self.canvas.coords(items['needle'], center_x, center_y, x_end, y_end)
+        self.canvas.itemconfigure(items['value'], text=str(int(clamped_value)))
+        if first_draw:
+            # Everything except the needle and arc only moves when the geometry changes
+            self.canvas.coords(items['arc'], center_x - radius, center_y - radius, center_x + radius, center_y + radius)
+            self.canvas.coords(items['hub'], center_x - 5, center_y - 5, center_x + 5, center_y + 5)
+            # FIX: Centered the text elements on the canvas
+            self.canvas.coords(items['value'], center_x, center_y - 20)
+            self.canvas.coords(items['unit'], center_x, center_y + 10)
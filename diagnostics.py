@@ -3,74 +3,459 @@ import obd
 import threading
 import time
 from simulator import OBDSimulator
+from scheduler import PollScheduler, DEFAULT_POLL_RATES
+from obd_pids import MODE01_PIDS, request_bytes, split_multi_pid_response
+from elm_fastpath import ElmFastPath
+from raw_elm327 import RawElm327, FREEZE_DTC_PID, decode_freeze_frame
+from vehicle_cache import VehicleCache
+from session_recorder import RecordingConnection, ReplayConnection, DEFAULT_KEEP, new_recording_path
+from freeze_frames import FreezeFrameEngine, parse_trigger_rules
+from freeze_frame_log import FreezeFrameLog, DEFAULT_KEEP as FREEZE_LOG_KEEP
+from column_recorder import ColumnRecorder
+from session_journal import SampleJournal, JOURNAL_SUFFIX, DEFAULT_POLICY
+
+# How often (seconds) the worst channel lag is shown in the status bar
+LAG_REPORT_INTERVAL = 2.0
+
+# ISO 15765 allows up to six PIDs in a single Mode 01 request
+MAX_PIDS_PER_REQUEST = 6
+# Multi-PID requests that fail this many times in a row (not a one-off NO DATA) turn batching off
+MAX_BATCH_FAILURES = 3
+# python-obd protocol ids for the ISO 15765-4 (CAN) protocols
+CAN_PROTOCOL_IDS = {"6", "7", "8", "9"}
+# Key under which poll() returns the ECU's Mode 02 freeze frame with the polled values
+ECU_FREEZE_FRAME = 'ecu_freeze_frame'
+
+def plain_value(value):
+    """Strips the pint unit from python-obd values so every transport yields plain numbers."""
+    return getattr(value, 'magnitude', value)
+
+def decode_multi_pid_messages(messages):
+    """python-obd decoder for multi-PID responses; uses the first ECU that answered."""
+    for message in messages:
+        values = split_multi_pid_response(bytes(message.data))
+        if values:
+            return values
+    return None
+
+class MultiPidBatcher:
+    """Packs Mode 01 PIDs into multi-PID requests, falling back to one query per PID."""
+    def __init__(self, connection):
+        self.connection = connection
+        protocol_id = getattr(connection, 'protocol_id', None)
+        self.enabled = protocol_id is not None and protocol_id() in CAN_PROTOCOL_IDS
+        self.failures = 0
+        self._batch_commands = {}
+
+    def query(self, commands):
+        """Queries the given commands and returns {command name: value or None}."""
+        values = {}
+        if self.enabled:
+            batchable = [cmd.name for cmd in commands if cmd.name in MODE01_PIDS]
+            for i in range(0, len(batchable), MAX_PIDS_PER_REQUEST):
+                names = tuple(batchable[i:i + MAX_PIDS_PER_REQUEST])
+                if len(names) < 2:
+                    continue
+                result = self._query_batch(names)
+                if not result:
+                    # Empty, rejected or garbled; these PIDs go out singly below
+                    self.failures += 1
+                    if self.failures >= MAX_BATCH_FAILURES:
+                        # Not a noisy link: the ECU doesn't do multi-PID requests
+                        self.enabled = False
+                    break
+                self.failures = 0
+                values.update(result)
+
+        # Anything the batch didn't answer goes out as a normal single request
+        for cmd in commands:
+            if cmd.name not in values:
+                response = self.connection.query(cmd)
+                values[cmd.name] = None if response.is_null() else plain_value(response.value)
+        return values
+
+    def _query_batch(self, names):
+        if hasattr(self.connection, 'query_multi'):
+            return self.connection.query_multi(names)
+        cmd = self._batch_commands.get(names)
+        if cmd is None:
+            cmd = obd.OBDCommand("MULTI_" + "_".join(names), "Multi-PID request",
+                                 request_bytes(names), 0, decode_multi_pid_messages)
+            self._batch_commands[names] = cmd
+        response = self.connection.query(cmd, force=True)
+        return None if response.is_null() else response.value
+
+def is_enabled(config, key, default='no'):
+    return config.get(key, default).strip().lower() in ('yes', 'true', '1', 'on')
+
+def recordings_keep(config):
+    """How many recordings of each kind to keep (`recordings_keep`); 0 keeps them all."""
+    try:
+        return max(0, int(config.get('recordings_keep', DEFAULT_KEEP)))
+    except ValueError:
+        return DEFAULT_KEEP
+
+_freeze_frame_commands = {}
+
+def freeze_frame_command(name):
+    """Command for one value of the ECU's own freeze frame (Mode 02, frame 0), e.g. FREEZE_RPM.
+
+    `name` is a Mode 01 PID name, or "DTC" for the code that stored the frame.
+    """
+    cmd = _freeze_frame_commands.get(name)
+    if cmd is None:
+        pid = FREEZE_DTC_PID if name == "DTC" else MODE01_PIDS[name].pid
+        full_name = "FREEZE_" + name
+
+        def decoder(messages):
+            for message in messages:
+                value = decode_freeze_frame(full_name, bytes(message.data))
+                if value is not None:
+                    return value
+            return None
+
+        cmd = obd.OBDCommand(full_name, f"Freeze frame {name}", b"02%02X00" % pid, 0, decoder)
+        _freeze_frame_commands[name] = cmd
+    return cmd
+
+def read_ecu_freeze_frame(connection, channels):
+    """Reads the ECU's stored freeze frame for the polled PIDs: {'dtc': code, channel: value}, or None."""
+    response = connection.query(freeze_frame_command("DTC"), force=True)
+    if response.is_null():
+        return None  # no freeze frame stored (or Mode 02 unsupported)
+    frame = {'dtc': response.value}
+    for key, cmd in channels.items():
+        if cmd.name in MODE01_PIDS:
+            response = connection.query(freeze_frame_command(cmd.name), force=True)
+            frame[key] = None if response.is_null() else plain_value(response.value)
+    return frame
+
+def open_connection(config, protocol=None):
+    """Opens the connection selected in the settings: simulator, replay, python-obd or raw ELM327."""
+    if config['connection_mode'] == 'Replay':
+        try:
+            speed = float(config.get('replay_speed', 1))
+        except ValueError:
+            speed = 1.0
+        return ReplayConnection(config.get('replay_file', ''), speed=speed)
+    if config['connection_mode'] == 'Simulator':
+        seed = config.get('sim_seed', '').strip()
+        return OBDSimulator(seed=int(seed) if seed.isdigit() else None,
+                            link_profile=config.get('sim_link_profile', 'ideal'))
+    if config.get('transport') == 'raw':
+        return RawElm327(config['address'], timeout=30, protocol=protocol)
+    # A TCP adapter has no baud rate; without one python-obd probes for it and waits out the full timeout
+    baudrate = 38400 if config['address'].startswith('socket://') else None
+    connection = obd.OBD(config['address'], baudrate=baudrate, protocol=protocol, fast=False, timeout=30)
+    # fast=False: ElmFastPath learns the response counts instead (see elm_fastpath.py for why)
+    return ElmFastPath(connection) if connection.is_connected() else connection
+
+def connect_with_cache(config, cache):
+    """Connects with the protocol cached for this adapter, falling back to a full auto-detect."""
+    address = config['address']
+    hint = cache.protocol_hint(address) if config['connection_mode'] not in ('Simulator', 'Replay') else None
+    if hint:
+        try:
+            connection = open_connection(config, protocol=hint)
+            if connection.is_connected():
+                return connection
+            connection.close()
+        except OSError:
+            pass
+        # A different bike is on this adapter; do the slow detect and relearn it
+        cache.forget_address(address)
+    return open_connection(config)
+
+def read_vin(connection):
+    """The vehicle's VIN, for transports that can read it (None otherwise)."""
+    return connection.read_vin() if hasattr(connection, 'read_vin') else None
+
+def cached_supported_pids(connection, vin, address, cache):
+    """Returns the vehicle's supported Mode 01 PIDs, reading the bitmaps only on a cache miss."""
+    if not hasattr(connection, 'supported_pids'):
+        return None
+    protocol = connection.protocol_id()
+    supported = cache.lookup(vin, address, protocol)
+    if supported is None:
+        supported = connection.supported_pids()
+        if supported:
+            cache.store(vin, address, protocol, supported)
+    return supported or None
+
+def build_commands():
+    """The gauge channels and the secondary-panel channels, keyed as the GUI expects."""
+    gauge_commands = {
+        'rpm': obd.commands.RPM,
+        'speed': obd.commands.SPEED,
+        'temp': obd.commands.COOLANT_TEMP,
+        'load': obd.commands.ENGINE_LOAD
+    }
+
+    secondary_commands = {
+        'Intake Pressure (kPa)': obd.commands.INTAKE_PRESSURE,
+        'Intake Temp (°C)': obd.commands.INTAKE_TEMP,
+        'Battery Voltage (V)': obd.commands.CONTROL_MODULE_VOLTAGE
+    }
+    return gauge_commands, secondary_commands
+
+class LiveDataSession:
+    """Polling state for one connection: which channels are due, querying them and publishing values.
+
+    `poll` does the blocking transport work; everything else only touches local state and
+    the callbacks, so the threaded loop and the asyncio engine can both drive it.
+    """
+    def __init__(self, connection, callbacks, brand, supported_pids=None, connect_time=None, config=None, vin=None):
+        config = config or {}
+        self.connection = connection
+        self.callbacks = callbacks
+        self.brand = brand
+        self.connect_time = connect_time
+        self.gauge_commands, self.secondary_commands = build_commands()
+
+        # Each channel is polled at its own rate; the most overdue one always goes next
+        self.channels = {**self.gauge_commands, **self.secondary_commands}
+        if supported_pids:
+            # Don't spend bus time on PIDs the ECU has told us it doesn't have
+            unsupported = [key for key, cmd in self.channels.items()
+                           if cmd.name in MODE01_PIDS and MODE01_PIDS[cmd.name].pid not in supported_pids]
+            for key in unsupported:
+                del self.channels[key]
+            if unsupported:
+                callbacks['output'](f"Skipping unsupported PIDs: {', '.join(unsupported)}\n", False)
+        rates = {name: DEFAULT_POLL_RATES.get(name, 1.0) for name in self.channels}
+
+        # Every published value goes to the sample sinks as (channel, monotonic time, value)
+        self.sample_sinks = []
+        self.freeze_frames = None
+        self.freeze_log = None
+        self.column_recorder = None
+        self.journal = None
+        self.known_dtcs = None
+        self._ecu_frame_capture = None
+        if is_enabled(config, 'freeze_frames', 'yes'):
+            self.freeze_log = FreezeFrameLog()
+            try:
+                self.freeze_log_keep = max(0, int(config.get('freeze_log_keep', FREEZE_LOG_KEEP)))
+            except ValueError:
+                self.freeze_log_keep = FREEZE_LOG_KEEP
+            self.freeze_frames = FreezeFrameEngine(
+                rates, sink=self._save_freeze_frame,
+                pre_seconds=float(config.get('freeze_pre_seconds', 10)),
+                post_seconds=float(config.get('freeze_post_seconds', 5)),
+                rules=parse_trigger_rules(config.get('freeze_triggers', '')), vin=vin)
+            self.sample_sinks.append(self.freeze_frames.on_sample)
+            # Watch for new trouble codes while polling; each one triggers a capture
+            self.channels['dtc'] = obd.commands.GET_DTC
+            rates['dtc'] = DEFAULT_POLL_RATES['dtc']
+        if is_enabled(config, 'record_columns', 'yes') and config.get('connection_mode') != 'Replay':
+            path = new_recording_path(suffix=".cols", keep=recordings_keep(config))
+            self.column_recorder = ColumnRecorder(path, [key for key in self.channels if key != 'dtc'],
+                                                  brand=brand, vin=vin, mode=config.get('connection_mode'))
+            if is_enabled(config, 'journal_sessions', 'yes'):
+                # Samples reach the journal before the recorder's buffers, so a crash can't lose them
+                self.journal = SampleJournal(path[:-len(".cols")] + JOURNAL_SUFFIX,
+                                             dict(self.column_recorder.header, recording=path),
+                                             config.get('journal_fsync', DEFAULT_POLICY))
+                self.sample_sinks.append(self.journal.on_sample)
+            self.sample_sinks.append(self.column_recorder.on_sample)
+
+        # A replay polls the recorded requests in order, at their recorded times on the replay clock
+        self.replay = connection if isinstance(connection, ReplayConnection) else None
+        self._replay_keys = {cmd.name: key for key, cmd in self.channels.items()}
+        self.scheduler = PollScheduler(rates, clock=self.replay.clock if self.replay else time.monotonic)
+        self.secondary_values = {name: "N/A" for name in self.secondary_commands}
+        self.batcher = MultiPidBatcher(connection)
+        self.next_report = time.monotonic() + LAG_REPORT_INTERVAL
+
+    def next_due(self):
+        """Channels to query next (several at once when the ECU accepts multi-PID requests)."""
+        if self.replay:
+            return self._next_recorded()
+        return self.scheduler.due(limit=MAX_PIDS_PER_REQUEST if self.batcher.enabled else 1)
+
+    def time_until_next(self):
+        """Seconds to wait before next_due() has something."""
+        if self.replay:
+            record = self.replay.peek()
+            return self.replay.time_until(record['t']) if record else 0.0
+        return self.scheduler.time_until_next()
+
+    def _next_recorded(self):
+        """Channels of the next recorded poll once the replay clock reaches it; [] until then."""
+        while True:
+            record = self.replay.peek()
+            if record is None or self.replay.time_until(record['t']) > 0:
+                return []
+            self.replay.take()
+            value = record['value']
+            names = list(value) if record['cmd'].startswith("MULTI_") and isinstance(value, dict) else [record['cmd']]
+            due = [self._replay_keys[name] for name in names if name in self._replay_keys]
+            if due:
+                return due
+
+    def poll(self, due):
+        """Queries the due channels. Blocks on the transport.
+
+        Runs on the I/O thread, so it only reads: everything it learns goes back
+        to publish() in the returned values.
+        """
+        values = self.batcher.query([self.channels[key] for key in due])
+        if self._ecu_frame_capture is not None:
+            # A new DTC was seen; the ECU stored its own freeze frame with it
+            values[ECU_FREEZE_FRAME] = read_ecu_freeze_frame(self.connection, self.channels)
+        return values
+
+    def publish(self, due, values):
+        """Marks the channels as serviced and hands the new values to the GUI callbacks."""
+        now = self.scheduler.clock()
+        if ECU_FREEZE_FRAME in values:
+            self.freeze_frames.attach_ecu_frame(self._ecu_frame_capture, values[ECU_FREEZE_FRAME])
+            self._ecu_frame_capture = None
+        for key in due:
+            self.scheduler.mark_polled(key)
+            value = values.get(self.channels[key].name)
+            if key == 'dtc':
+                self.check_dtcs(value, now)
+                continue
+            if value is not None:
+                for sink in self.sample_sinks:
+                    sink(key, now, value)
+            if key in self.gauge_commands:
+                if value is not None: self.callbacks[f'update_{key}'](value)
+            else:
+                self.secondary_values[key] = round(value, 1) if value is not None else "N/A"
+
+        if any(key in self.secondary_commands for key in due):
+            secondary_data_str = "".join(f"{name}: {value}\n" for name, value in self.secondary_values.items())
+            self.callbacks['update_secondary_data'](secondary_data_str)
+
+        if time.monotonic() >= self.next_report:
+            worst, lag_ms = self.scheduler.worst_lag()
+            self.callbacks['status'](f"Connected to {self.brand} | Polling live data... | Max lag: {worst} {lag_ms:.0f} ms")
+            self.next_report = time.monotonic() + LAG_REPORT_INTERVAL
+
+    def check_dtcs(self, dtcs, now):
+        """Starts a freeze-frame capture when a code shows up that wasn't stored before."""
+        if dtcs is None:
+            return
+        codes = [code for code, _ in dtcs]
+        if self.known_dtcs is None:
+            # Codes already stored when the session started aren't new
+            self.known_dtcs = set(codes)
+            return
+        new = [code for code in codes if code not in self.known_dtcs]
+        if not new:
+            return
+        self.known_dtcs.update(new)
+        self.callbacks['output'](f"🚨 New trouble code: {', '.join(new)} - capturing freeze frame\n", False)
+        # The next poll() reads the ECU's freeze frame for this capture
+        self._ecu_frame_capture = self.freeze_frames.trigger("DTC " + ", ".join(new), now, dtcs=new)
+
+    def _save_freeze_frame(self, record):
+        self.freeze_log.append(record)
+        if self.freeze_log.trim(self.freeze_log_keep):
+            self.callbacks['output'](f"Freeze frame log trimmed to the newest {self.freeze_log_keep} records.\n", False)
+        number = len(self.freeze_log) - 1
+        self.callbacks['output'](f"📸 Freeze frame #{number} saved ({record['trigger']}).\n", False)
+
+    def close(self):
+        """Finishes the session's recordings. Safe to call more than once."""
+        if self.freeze_frames:
+            # Captures still waiting for their post-trigger window keep what they have
+            self.freeze_frames.flush()
+        if self.column_recorder:
+            self.column_recorder.close()
+            self.callbacks['output'](f"Live data recorded to {self.column_recorder.path} "
+                                     f"({self.column_recorder.samples} samples)\n", False)
+            self.column_recorder = None
+        if self.journal:
+            # Only now is everything in the session file
+            self.journal.discard()
+            self.journal = None
+
+    def report(self):
+        """Writes the per-channel rate/lag and per-PID latency summary to the log."""
+        callbacks = self.callbacks
+        callbacks['output']("\n--- Live data polling stopped. ---\n", False)
+        if self.connect_time is not None:
+            callbacks['output'](f"Connect time: {self.connect_time:.2f} s\n", False)
+        for name, stats in self.scheduler.report().items():
+            callbacks['output'](f"{name}: {stats['achieved_hz']:.1f}/{stats['target_hz']:.0f} Hz, max lag {stats['max_lag_ms']:.0f} ms\n", False)
+        if hasattr(self.connection, 'latency_report'):
+            for name, (before, after) in self.connection.latency_report().items():
+                before_str = f"{before:.0f} ms" if before is not None else "-"
+                after_str = f"{after:.0f} ms" if after is not None else "-"
+                callbacks['output'](f"{name} latency: {before_str} -> {after_str}\n", False)
+        if hasattr(self.connection, 'link_report'):
+            callbacks['output'](self.connection.link_report() + "\n", False)
+
+def report_dtcs(response_dtc, callbacks):
+    """Shows the result of a GET_DTC query."""
+    dtc_list = response_dtc.value
+    if not response_dtc.is_null() and dtc_list:
+        # Call the new dedicated callback with the list of found codes
+        callbacks['display_dtcs'](dtc_list)
+    else:
+        callbacks['output']("👍 No stored trouble codes found.\n", False)
+
+def connect_session(config):
+    """Connects (using the vehicle cache) and returns (connection, supported PIDs, VIN). Blocks.
+
+    Live sessions are wrapped in a RecordingConnection when `record_sessions` is on.
+    """
+    if config['connection_mode'] == 'Replay':
+        connection = open_connection(config)
+        return connection, connection.recorded_supported_pids(), connection.header.get('vin')
+    cache = VehicleCache()
+    connection = connect_with_cache(config, cache)
+    if not connection.is_connected():
+        connection.close()
+        raise ConnectionError("Could not connect to the ECU.")
+    vin = read_vin(connection)
+    supported = cached_supported_pids(connection, vin, config['address'], cache)
+    if is_enabled(config, 'record_sessions', 'yes'):
+        connection = RecordingConnection(connection, new_recording_path(keep=recordings_keep(config)), brand=config['brand'],
+                                         mode=config['connection_mode'], vin=vin,
+                                         supported_pids=sorted(supported) if supported else None)
+    return connection, supported, vin
 
 def run_diagnostics_thread(config, callbacks, stop_event):
     connection = None
+    session = None
     try:
         brand = config['brand']
         mode = config['connection_mode']
-        address = config['address']
 
         callbacks['status'](f"Connecting to {brand} via {mode}...")
         callbacks['output'](f"Attempting to connect... 🏍️\n", True)
 
-        if mode == 'Simulator':
-            connection = OBDSimulator()
-        else:
-            connection = obd.OBD(address, fast=False, timeout=30)
-        
-        if not connection.is_connected(): raise ConnectionError("Could not connect to the ECU.")
+        connect_start = time.perf_counter()
+        connection, supported_pids, vin = connect_session(config)
+        connect_time = time.perf_counter() - connect_start
 
         callbacks['status'](f"Connected to {brand} | Polling live data...")
-        callbacks['output'](f"✅ Successfully connected!\n", True)
-
-        gauge_commands = {
-            'rpm': obd.commands.RPM,
-            'speed': obd.commands.SPEED,
-            'temp': obd.commands.COOLANT_TEMP,
-            'load': obd.commands.ENGINE_LOAD
-        }
-
-        secondary_commands = {
-            'Intake Pressure (kPa)': obd.commands.INTAKE_PRESSURE,
-            'Intake Temp (°C)': obd.commands.INTAKE_TEMP,
-            'Battery Voltage (V)': obd.commands.CONTROL_MODULE_VOLTAGE
-        }
-        
-        # --- CLEANED UP CONTINUOUS DATA LOOP ---
-        while not stop_event.is_set():
-            # This single block now correctly updates both gauges and the text panel
-            for key, cmd in gauge_commands.items():
-                response = connection.query(cmd)
-                if not response.is_null(): callbacks[f'update_{key}'](response.value)
-
-            secondary_data_str = ""
-            for name, cmd in secondary_commands.items():
-                response = connection.query(cmd)
-                value = response.value if not response.is_null() else "N/A"
-                secondary_data_str += f"{name}: {value}\n"
-            
-            callbacks['update_secondary_data'](secondary_data_str)
-            
-            # Use the correct, shorter sleep time from our previous fix
-            time.sleep(0.1)
-
-        # (DTC Scan logic remains the same)
-        callbacks['output']("\n--- Live data polling stopped. ---\n", False)
-        response_dtc = connection.query(obd.commands.GET_DTC)
-        dtc_list = response_dtc.value
-        
-        if not response_dtc.is_null() and dtc_list:
-            # Call the new dedicated callback with the list of found codes
-            callbacks['display_dtcs'](dtc_list)
-        else:
-            callbacks['output']("👍 No stored trouble codes found.\n", False)
+        callbacks['output'](f"✅ Successfully connected! ({connect_time:.2f} s)\n", True)
+
+        # --- SCHEDULED CONTINUOUS DATA LOOP ---
+        session = LiveDataSession(connection, callbacks, brand, supported_pids, connect_time, config, vin)
+        # A replay reports disconnected once the recording runs out
+        while not stop_event.is_set() and connection.is_connected():
+            due = session.next_due()
+            if not due:
+                # Nothing is due yet; wait for the next deadline (or for Stop)
+                stop_event.wait(session.time_until_next())
+                continue
+            session.publish(due, session.poll(due))
+
+        session.report()
+        report_dtcs(connection.query(obd.commands.GET_DTC), callbacks)
 
     except Exception as e:
         callbacks['output'](f"❌ ERROR: {e}\n", True)
         callbacks['error']("Error", f"An error occurred: {e}")
     
     finally:
+        if session: session.close()
         if connection: connection.close()
         callbacks['status']("Ready")
         callbacks['reset_buttons']()
\ No newline at end of file
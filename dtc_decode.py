@@ -0,0 +1,149 @@
+# dtc_decode.py
+"""Decodes DTC lists in bulk: reads codes from files or stdin, writes JSONL or CSV.
+
+Usage: py dtc_decode.py [FILE ...] [--format jsonl|csv] [--brand NAME] [--jobs N] [-o OUT]
+
+Any text works as input; every J2012 code found on a line (e.g. "P0301, P0420")
+becomes one output record. Input is read in chunks and at most a few chunks are in
+flight at once, so memory stays flat however large the input is. Inputs bigger than
+one chunk are decoded by a process pool.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from dtc_index import DTC_CODES, parse_code
+
+FIELDS = ['source', 'line', 'code', 'known', 'description', 'system', 'system_name',
+          'generic', 'subsystem', 'subsystem_name']
+# Lines per unit of work handed to a worker
+CHUNK_LINES = 20000
+# Chunks queued per worker; bounds memory when the writer is slower than the workers
+CHUNKS_IN_FLIGHT = 2
+
+CODE_PATTERN = re.compile(r"\b[PCBU][0-3][0-9A-F]{3}\b")
+
+_codes = DTC_CODES
+# code -> its output fields after 'source' and 'line', rendered once per process
+_rendered = {}
+
+def _init_worker(brand):
+    global _codes
+    if brand:
+        from dtc_overlays import codes_for_brand
+        _codes = codes_for_brand(brand)
+
+def _fields(code):
+    desc = _codes.get(code)
+    fields = parse_code(code)
+    return [code, desc is not None, desc or "", fields['system'], fields['system_name'],
+            fields['generic'], fields['subsystem'], fields['subsystem_name'] or ""]
+
+def _render_jsonl(code):
+    values = _fields(code)
+    return json.dumps(dict(zip(FIELDS[2:], values)), ensure_ascii=False)[1:] + "\n"
+
+def _render_csv(code):
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerow(_fields(code))
+    return out.getvalue()
+
+def decode_chunk(source, first_line, lines, fmt):
+    """Decodes a list of input lines into output text in the given format."""
+    render = _render_jsonl if fmt == 'jsonl' else _render_csv
+    cache = _rendered.setdefault(fmt, {})
+    if fmt == 'jsonl':
+        prefix = '{"source": ' + json.dumps(source, ensure_ascii=False) + ', "line": '
+        suffix_sep = ", "
+    else:
+        out = io.StringIO()
+        csv.writer(out, lineterminator="").writerow([source])
+        prefix = out.getvalue() + ","
+        suffix_sep = ","
+    parts = []
+    for n, line in enumerate(lines, first_line):
+        for code in CODE_PATTERN.findall(line.upper()):
+            rendered = cache.get(code)
+            if rendered is None:
+                rendered = cache[code] = render(code)
+            parts.append(f"{prefix}{n}{suffix_sep}{rendered}")
+    return "".join(parts)
+
+def read_chunks(paths, chunk_lines=CHUNK_LINES):
+    """Yields (source, first line number, lines) for each chunk of each input."""
+    for path in paths:
+        if path == "-":
+            f, source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace"), "<stdin>"
+        else:
+            f, source = open(path, "r", encoding="utf-8", errors="replace"), path
+        try:
+            first = 1
+            while True:
+                lines = list(islice(f, chunk_lines))
+                if not lines:
+                    break
+                yield source, first, lines
+                first += len(lines)
+        finally:
+            if path != "-":
+                f.close()
+
+def decode_stream(paths, out, fmt='jsonl', brand=None, jobs=None):
+    """Decodes every input into `out`. Returns the number of input lines read."""
+    jobs = jobs or os.cpu_count() or 1
+    _init_worker(brand)
+    if fmt == 'csv':
+        out.write(",".join(FIELDS) + "\n")
+    chunks = read_chunks(paths)
+    lines_read = 0
+
+    first = next(chunks, None)
+    if first is None:
+        return 0
+    second = next(chunks, None)
+    if second is None or jobs == 1:
+        # Small input (or asked to): the pool would cost more than it saves
+        for chunk in chain(filter(None, (first, second)), chunks):
+            out.write(decode_chunk(*chunk, fmt))
+            lines_read += len(chunk[2])
+        return lines_read
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(brand,)) as pool:
+        pending = deque()
+        for chunk in chain((first, second), chunks):
+            pending.append(pool.submit(decode_chunk, *chunk, fmt))
+            lines_read += len(chunk[2])
+            if len(pending) >= jobs * CHUNKS_IN_FLIGHT:
+                out.write(pending.popleft().result())
+        while pending:
+            out.write(pending.popleft().result())
+    return lines_read
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*", default=["-"], help="input files, '-' for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (default)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--brand", default=None, help="also look codes up in this brand's overlay")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.output == "-":
+        out = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="", write_through=False)
+    else:
+        out = open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        decode_stream(args.inputs, out, args.format, args.brand, args.jobs)
+    finally:
+        out.flush()
+        if args.output != "-":
+            out.close()
+
+if __name__ == "__main__":
+    main()
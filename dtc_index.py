@@ -0,0 +1,213 @@
+# dtc_index.py
+"""Compact on-disk index of the DTC database, memory-mapped and loaded on first lookup.
+
+File layout (little-endian):
+    header        magic, version, code count, description count, source size and mtime
+    codes         uint16[count], sorted J2012 codes (2 bits letter, 2 bits digit, 12 bits)
+    desc_ids      uint16[count], index into the description table for each code
+    desc_offsets  uint32[descriptions + 1], byte offsets into the text blob
+    text blob     UTF-8 descriptions, each stored once
+
+`DTC_CODES` is a read-only dict-like view over the index, so callers that used
+`dtc_database.DTC_CODES` keep working unchanged.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dtc_index.bin')
+SOURCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dtc_database.py')
+
+MAGIC = b"DTCI"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIqq")  # magic, version, reserved, codes, descriptions, source size, source mtime
+LETTERS = "PCBU"
+
+def encode_code(code):
+    """Packs a J2012 code such as "P0301" into its 16-bit form (as sent by the ECU)."""
+    if (len(code) != 5 or code[0] not in LETTERS or code[1] not in "0123"
+            or not all(c in "0123456789ABCDEF" for c in code[2:])):
+        raise ValueError(f"Not a J2012 code: {code!r}")
+    return (LETTERS.index(code[0]) << 14) | int(code[1:], 16)
+
+def decode_code(value):
+    """Unpacks a 16-bit J2012 code back into text."""
+    return f"{LETTERS[value >> 14]}{(value >> 12) & 0x3}{value & 0xFFF:03X}"
+
+SYSTEMS = {'P': 'Powertrain', 'C': 'Chassis', 'B': 'Body', 'U': 'Network'}
+# SAE J2012 powertrain subsystems, by the third character of the code
+POWERTRAIN_SUBSYSTEMS = {
+    '0': 'Fuel and Air Metering and Auxiliary Emission Controls',
+    '1': 'Fuel and Air Metering', '2': 'Fuel and Air Metering (Injector Circuit)',
+    '3': 'Ignition System or Misfire', '4': 'Auxiliary Emission Controls',
+    '5': 'Vehicle Speed Control, Idle Control and Auxiliary Inputs',
+    '6': 'Computer and Auxiliary Outputs', '7': 'Transmission', '8': 'Transmission',
+    '9': 'Transmission', 'A': 'Hybrid Propulsion', 'B': 'Hybrid Propulsion', 'C': 'Hybrid Propulsion',
+}
+
+def parse_code(code):
+    """Splits a J2012 code into its fields: system letter and name, generic vs manufacturer, subsystem."""
+    code = code.upper()
+    encode_code(code)  # validates the format
+    letter, group, subsystem = code[0], code[1], code[2]
+    if letter == 'P' and group == '3':
+        # P30xx-P33xx are manufacturer controlled, P34xx-P39xx are SAE
+        generic = subsystem in "456789"
+    else:
+        generic = group in ('0', '2', '3') if letter == 'P' else group in ('0', '3')
+    return {
+        'code': code,
+        'system': letter,
+        'system_name': SYSTEMS[letter],
+        'generic': generic,
+        'subsystem': subsystem,
+        'subsystem_name': POWERTRAIN_SUBSYSTEMS.get(subsystem) if letter == 'P' and group in '012' else None,
+    }
+
+def source_stamp():
+    try:
+        stat = os.stat(SOURCE_FILE)
+    except OSError:
+        return None  # e.g. a frozen build without the source next to it
+    return stat.st_size, stat.st_mtime_ns
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+def build_index_bytes(codes):
+    """Serializes a {code: description} dict into the index format."""
+    entries = sorted((encode_code(code), desc) for code, desc in codes.items())
+    descriptions = []
+    desc_ids = {}
+    for _, desc in entries:
+        if desc not in desc_ids:
+            desc_ids[desc] = len(descriptions)
+            descriptions.append(desc)
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for desc in descriptions:
+        blob += desc.encode("utf-8")
+        offsets.append(len(blob))
+
+    size, mtime = source_stamp() or (0, 0)
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, 0, len(entries), len(descriptions), size, mtime),
+        _little_endian(array("H", [value for value, _ in entries])),
+        _little_endian(array("H", [desc_ids[desc] for _, desc in entries])),
+        _little_endian(offsets),
+        bytes(blob),
+    ])
+
+def build_index(path=INDEX_FILE):
+    """Builds the index file from dtc_database.py. Returns the index bytes."""
+    from dtc_database import DTC_CODES as SOURCE_CODES
+    data = build_index_bytes(SOURCE_CODES)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+def _is_current(path):
+    """True if the index exists and was built from the current dtc_database.py."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return False
+    if len(header) < HEADER.size:
+        return False
+    magic, version, _, _, _, size, mtime = HEADER.unpack(header)
+    stamp = source_stamp()
+    return magic == MAGIC and version == VERSION and (stamp is None or stamp == (size, mtime))
+
+class DtcIndex(Mapping):
+    """Read-only {code: description} mapping backed by the memory-mapped index."""
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._loaded = False
+
+    def _load(self):
+        if not _is_current(self.path):
+            try:
+                build_index(self.path)
+            except OSError:
+                # Read-only install: keep a freshly built index in memory instead
+                from dtc_database import DTC_CODES as SOURCE_CODES
+                self._attach(build_index_bytes(SOURCE_CODES))
+                return
+        with open(self.path, "rb") as f:
+            self._attach(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _attach(self, buffer):
+        _, _, _, count, n_desc, _, _ = HEADER.unpack_from(buffer, 0)
+        view = memoryview(buffer)
+        codes_at = HEADER.size
+        ids_at = codes_at + 2 * count
+        offsets_at = ids_at + 2 * count
+        blob_at = offsets_at + 4 * (n_desc + 1)
+        self._buffer = buffer
+        if sys.byteorder == "little":
+            self._codes = view[codes_at:ids_at].cast("H")
+            self._desc_ids = view[ids_at:offsets_at].cast("H")
+            self._offsets = view[offsets_at:blob_at].cast("I")
+        else:
+            self._codes, self._desc_ids, self._offsets = (
+                array("H", view[codes_at:ids_at]), array("H", view[ids_at:offsets_at]),
+                array("I", view[offsets_at:blob_at]))
+            for values in (self._codes, self._desc_ids, self._offsets):
+                values.byteswap()
+        self._blob = view[blob_at:]
+        # Decoded descriptions, filled lazily so repeated lookups share one string
+        self._descriptions = [None] * n_desc
+        self._loaded = True
+
+    def _position(self, code):
+        if not self._loaded:
+            self._load()
+        try:
+            value = encode_code(code.upper())
+        except (ValueError, IndexError, AttributeError):
+            return None
+        i = bisect_left(self._codes, value)
+        return i if i < len(self._codes) and self._codes[i] == value else None
+
+    def _description(self, i):
+        desc_id = self._desc_ids[i]
+        desc = self._descriptions[desc_id]
+        if desc is None:
+            desc = sys.intern(str(self._blob[self._offsets[desc_id]:self._offsets[desc_id + 1]], "utf-8"))
+            self._descriptions[desc_id] = desc
+        return desc
+
+    def __getitem__(self, code):
+        i = self._position(code) if isinstance(code, str) and len(code) == 5 else None
+        if i is None:
+            raise KeyError(code)
+        return self._description(i)
+
+    def __contains__(self, code):
+        return isinstance(code, str) and len(code) == 5 and self._position(code) is not None
+
+    def __len__(self):
+        if not self._loaded:
+            self._load()
+        return len(self._codes)
+
+    def __iter__(self):
+        if not self._loaded:
+            self._load()
+        return (decode_code(value) for value in self._codes)
+
+DTC_CODES = DtcIndex()
+
+if __name__ == "__main__":
+    data = build_index()
+    print(f"Wrote {INDEX_FILE}: {len(DTC_CODES)} codes, {len(data)} bytes")
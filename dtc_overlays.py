@@ -0,0 +1,80 @@
+# dtc_overlays.py
+"""Brand-specific DTC layers on top of the generic SAE database.
+
+A brand overlay is a JSON file ``dtc_overlays/<brand>.json`` mapping codes to
+descriptions, e.g. ``{"P1A00": "..."}``, usually manufacturer P1xxx and U-codes.
+Lookups check the overlay first and fall back to the generic codes.
+"""
+import json
+import os
+from collections.abc import Mapping
+from dtc_index import DTC_CODES
+
+OVERLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dtc_overlays')
+
+def overlay_path(brand):
+    return os.path.join(OVERLAY_DIR, f"{brand.strip().lower()}.json")
+
+class LayeredDtcCodes(Mapping):
+    """Read-only {code: description} view: brand overlay first, then the generic base.
+
+    The overlay file is only read on the first lookup, and every lookup result
+    (including misses) is memoized for this brand.
+    """
+    def __init__(self, brand, base=DTC_CODES):
+        self.brand = brand
+        self.base = base
+        self._overlay = None
+        self._memo = {}
+
+    @property
+    def overlay(self):
+        if self._overlay is None:
+            try:
+                with open(overlay_path(self.brand), 'r', encoding='utf-8') as f:
+                    self._overlay = {code.upper(): desc for code, desc in json.load(f).items()}
+            except FileNotFoundError:
+                self._overlay = {}  # No manufacturer codes for this brand yet
+            except (OSError, ValueError) as e:
+                print(f"Could not load DTC overlay for {self.brand}: {e}")
+                self._overlay = {}
+        return self._overlay
+
+    def get(self, code, default=None):
+        try:
+            desc = self._memo[code]
+        except KeyError:
+            key = code.upper() if isinstance(code, str) else code
+            desc = self.overlay.get(key) or self.base.get(key)
+            self._memo[code] = desc
+        return default if desc is None else desc
+
+    def __getitem__(self, code):
+        desc = self.get(code)
+        if desc is None:
+            raise KeyError(code)
+        return desc
+
+    def __contains__(self, code):
+        return self.get(code) is not None
+
+    def __iter__(self):
+        overlay = self.overlay
+        yield from overlay
+        yield from (code for code in self.base if code not in overlay)
+
+    def __bool__(self):
+        return bool(self.overlay) or bool(self.base)
+
+    def __len__(self):
+        overlay = self.overlay
+        return len(overlay) + sum(1 for code in self.base if code not in overlay)
+
+_layers = {}
+
+def codes_for_brand(brand):
+    """The layered code view for a brand; one per brand so its memo is shared."""
+    layer = _layers.get(brand)
+    if layer is None:
+        layer = _layers[brand] = LayeredDtcCodes(brand)
+    return layer
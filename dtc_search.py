@@ -0,0 +1,129 @@
+# dtc_search.py
+import re
+from bisect import bisect_left
+
+MAX_RESULTS = 50
+# Query tokens shorter than this are only matched exactly (typos in "2" or "o2" aren't typos)
+MIN_FUZZY_LENGTH = 4
+# How much a match of each kind counts towards a description's score
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+
+CODE_PREFIX = re.compile(r"^[PCBU][0-3]?[0-9A-F]{0,3}$")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+def _deletes(token):
+    """All variants of the token with one character removed."""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+class DtcSearchIndex:
+    """Search-as-you-type over DTC codes and descriptions.
+
+    Codes go into a prefix trie; descriptions into an inverted token index. Typos are
+    handled with a one-edit deletion index over the description vocabulary, so a
+    misspelled token finds its candidates with dictionary lookups instead of a scan.
+    """
+    def __init__(self, codes):
+        self.codes = sorted(codes)
+        self.descriptions = [codes[code] for code in self.codes]
+
+        # Trie node: {char: child node}, with the key None holding every code below it
+        self.trie = {None: []}
+        for i, code in enumerate(self.codes):
+            node = self.trie
+            node[None].append(i)
+            for char in code:
+                node = node.setdefault(char, {None: []})
+                node[None].append(i)
+
+        self.postings = {}
+        for i, desc in enumerate(self.descriptions):
+            for token in set(tokenize(desc)):
+                self.postings.setdefault(token, []).append(i)
+        self.vocabulary = sorted(self.postings)
+
+        # deletion variant -> vocabulary tokens it came from (and the token itself)
+        self.deletes = {}
+        for token in self.vocabulary:
+            if len(token) >= MIN_FUZZY_LENGTH:
+                self.deletes.setdefault(token, set()).add(token)
+                for variant in _deletes(token):
+                    self.deletes.setdefault(variant, set()).add(token)
+
+    def code_prefix(self, prefix, limit=MAX_RESULTS):
+        """Codes starting with the prefix, in code order."""
+        node = self.trie
+        for char in prefix.upper():
+            node = node.get(char)
+            if node is None:
+                return []
+        return node[None][:limit]
+
+    def _candidates(self, token, allow_prefix):
+        """{vocabulary token: weight} for one query token."""
+        matches = {}
+        if token in self.postings:
+            matches[token] = EXACT_WEIGHT
+        if allow_prefix:
+            # The token being typed may be incomplete
+            i = bisect_left(self.vocabulary, token)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(token):
+                matches.setdefault(self.vocabulary[i], PREFIX_WEIGHT)
+                i += 1
+        if len(token) >= MIN_FUZZY_LENGTH:
+            # Tokens within one edit: substitution, insertion, deletion or (most) transpositions
+            for variant in _deletes(token) | {token}:
+                for word in self.deletes.get(variant, ()):
+                    matches.setdefault(word, FUZZY_WEIGHT)
+        return matches
+
+    def search_descriptions(self, text, limit=MAX_RESULTS):
+        """Ranks descriptions matching every query token (exactly, by prefix or within one typo)."""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        scores = None
+        for n, token in enumerate(tokens):
+            token_scores = {}
+            for word, weight in self._candidates(token, allow_prefix=(n == len(tokens) - 1)).items():
+                for i in self.postings[word]:
+                    if weight > token_scores.get(i, 0.0):
+                        token_scores[i] = weight
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {i: score + token_scores[i] for i, score in scores.items() if i in token_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores, key=lambda i: (-scores[i], len(self.descriptions[i]), i))
+        return ranked[:limit]
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Returns [(code, description)]: code-prefix hits first, then description matches."""
+        query = query.strip()
+        if not query:
+            return []
+        hits = []
+        if CODE_PREFIX.match(query.upper()):
+            hits = self.code_prefix(query, limit)
+        if len(hits) < limit:
+            seen = set(hits)
+            hits += [i for i in self.search_descriptions(query, limit) if i not in seen][:limit - len(hits)]
+        return [(self.codes[i], self.descriptions[i]) for i in hits]
+
+_indexes = {}
+
+def get_search_index(codes=None):
+    """The search index over a code mapping (the full DTC database by default), built once per mapping."""
+    if codes is None:
+        from dtc_index import DTC_CODES
+        codes = DTC_CODES
+    entry = _indexes.get(id(codes))
+    if entry is None:
+        # Keep a reference to the mapping so its id can't be reused by another object
+        entry = _indexes[id(codes)] = (codes, DtcSearchIndex(codes))
+    return entry[1]
@@ -0,0 +1,163 @@
+# dtc_sqlite.py
+"""Optional SQLite store of the DTC database with FTS5 full-text search.
+
+Built once from dtc_index.DTC_CODES into dtc_codes.sqlite and reused until
+dtc_database.py changes, so opening it costs no parsing. Select it with
+``dtc_backend = sqlite`` in settings.ini.
+"""
+import os
+import re
+import sqlite3
+from dtc_index import DTC_CODES, encode_code, parse_code, source_stamp
+from dtc_search import MAX_RESULTS
+
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dtc_codes.sqlite')
+SCHEMA_VERSION = '1'
+# Stay under SQLite's default limit on bound parameters per statement
+MAX_PARAMS = 900
+# Stricter than dtc_search.CODE_PREFIX: the range query needs the J2012 digit after the
+# system letter, so words like "bad" or partial codes like "P4" go to full-text search only
+CODE_PREFIX = re.compile(r"^[PCBU]([0-3][0-9A-F]{0,3})?$")
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+-- id is the 16-bit J2012 value, so code ranges are integer ranges
+CREATE TABLE codes (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    system TEXT NOT NULL,
+    generic INTEGER NOT NULL,
+    subsystem TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX codes_fields ON codes (system, generic, subsystem);
+CREATE VIRTUAL TABLE codes_fts USING fts5 (
+    description, content='codes', content_rowid='id', tokenize='porter unicode61'
+);
+"""
+
+def fts5_available():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5 (x)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+def _stamp():
+    return f"{SCHEMA_VERSION}:{source_stamp()}"
+
+def build_database(path=DB_FILE, codes=DTC_CODES):
+    """(Re)builds the SQLite file from the DTC codes."""
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    try:
+        db.executescript(SCHEMA)
+        rows = []
+        for code, desc in codes.items():
+            fields = parse_code(code)
+            rows.append((encode_code(code), code, fields['system'], int(fields['generic']), fields['subsystem'], desc))
+        db.executemany("INSERT INTO codes VALUES (?, ?, ?, ?, ?, ?)", rows)
+        db.execute("INSERT INTO codes_fts (codes_fts) VALUES ('rebuild')")
+        db.execute("INSERT INTO meta VALUES ('stamp', ?)", (_stamp(),))
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmp_path, path)
+
+def _fts_query(text):
+    """Turns free text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = ["".join(ch for ch in word if ch.isalnum()) for word in text.split()]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words[:-1]) + (" " if len(words) > 1 else "") + f'"{words[-1]}"*'
+
+class DtcSqliteStore:
+    """Ranked full-text search, J2012 range queries and batch lookups over the SQLite file."""
+    def __init__(self, path=DB_FILE):
+        if not fts5_available():
+            raise RuntimeError("This Python's SQLite was built without FTS5.")
+        self.path = path
+        if not self._is_current():
+            build_database(path)
+        self.db = sqlite3.connect(path)
+
+    def _is_current(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            db = sqlite3.connect(self.path)
+            try:
+                row = db.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+            finally:
+                db.close()
+        except sqlite3.DatabaseError:
+            return False
+        return row is not None and row[0] == _stamp()
+
+    def get(self, code, default=None):
+        row = self.db.execute("SELECT description FROM codes WHERE code = ?", (code.upper(),)).fetchone()
+        return row[0] if row else default
+
+    def lookup_many(self, codes):
+        """{code: description} for every known code in the list, one statement per 900 codes."""
+        codes = list({code.upper() for code in codes})
+        found = {}
+        for i in range(0, len(codes), MAX_PARAMS):
+            chunk = codes[i:i + MAX_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(self.db.execute(
+                f"SELECT code, description FROM codes WHERE code IN ({placeholders})", chunk))
+        return found
+
+    def code_range(self, first, last, limit=None):
+        """[(code, description)] for first <= code <= last in J2012 order, e.g. ("P0300", "P03FF")."""
+        sql = "SELECT code, description FROM codes WHERE id BETWEEN ? AND ? ORDER BY id"
+        params = [encode_code(first.upper()), encode_code(last.upper())]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.db.execute(sql, params).fetchall()
+
+    def code_prefix(self, prefix, limit=None):
+        """All codes starting with a prefix, e.g. "P03" for the misfire range."""
+        prefix = prefix.upper()
+        if not prefix or not CODE_PREFIX.match(prefix):
+            return []
+        return self.code_range(prefix + "0000"[len(prefix) - 1:], prefix + "3FFF"[len(prefix) - 1:], limit)
+
+    def search(self, text, limit=MAX_RESULTS, system=None, generic=None):
+        """[(code, description)] ranked by BM25, optionally filtered by J2012 fields."""
+        query = _fts_query(text)
+        if query is None:
+            return []
+        sql = ("SELECT c.code, c.description FROM codes_fts JOIN codes c ON c.id = codes_fts.rowid "
+               "WHERE codes_fts MATCH ?")
+        params = [query]
+        if system is not None:
+            sql += " AND c.system = ?"
+            params.append(system)
+        if generic is not None:
+            sql += " AND c.generic = ?"
+            params.append(int(generic))
+        sql += " ORDER BY bm25(codes_fts) LIMIT ?"
+        params.append(limit)
+        # A code or code prefix typed into the box lists that range first
+        results = self.code_prefix(text.strip(), limit)
+        seen = {code for code, _ in results}
+        results += [row for row in self.db.execute(sql, params) if row[0] not in seen]
+        return results[:limit]
+
+    def close(self):
+        self.db.close()
+
+_store = None
+
+def get_sqlite_store():
+    """The shared store, built on first use. Raises RuntimeError if FTS5 is unavailable."""
+    global _store
+    if _store is None:
+        _store = DtcSqliteStore()
+    return _store
@@ -0,0 +1,279 @@
+# elm_emulator.py
+"""ELM327 emulator on a TCP port, answering from the simulator's vehicle model.
+
+Usage: py elm_emulator.py [--host 127.0.0.1] [--port 35000] [--seed N] [--link PROFILE]
+
+Point the app at it with Wi-Fi mode and address socket://127.0.0.1:35000; the real
+python-obd (or raw) transport then runs end to end: AT setup, protocol search,
+CAN framing with or without headers, multi-frame replies. Every client gets its
+own vehicle (seeded per connection), so one server can stand in for a fleet.
+"""
+import argparse
+import asyncio
+import random
+from collections import namedtuple
+from link_profiles import SimulatedLink, NO_DATA, TIMEOUT, GARBLED
+from dtc_index import encode_code
+from obd_pids import PIDS_BY_NUMBER, encode
+from raw_elm327 import FREEZE_DTC_PID
+from simulator import OBDSimulator, PID_VALUES
+
+DEFAULT_PORT = 35000
+ELM_VERSION = "ELM327 v1.5"
+# The emulated bike talks ISO 15765-4 CAN, 11-bit IDs, 500 kbaud
+PROTOCOL = "6"
+PROTOCOL_NAME = "ISO 15765-4 (CAN 11/500)"
+ECU_HEADER = "7E8"
+MAX_PIDS_PER_REQUEST = 6
+# AT settings that only tune timing or formats the emulated replies don't depend on
+ACCEPTED_AT_PREFIXES = ("ST", "AT", "CAF", "CFC", "D", "AL", "NL", "M", "PC", "LP", "BI")
+
+Command = namedtuple('Command', ['name'])
+
+def _supported_bitmap(base, pids):
+    """The 4-byte "PIDs supported" bitmap for base+1..base+32."""
+    bits = 0
+    for pid in pids:
+        if base < pid <= base + 32:
+            bits |= 1 << (32 - (pid - base))
+    return bits.to_bytes(4, 'big')
+
+def _make_vin(rng):
+    chars = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"  # no I, O or Q in a VIN
+    return "JH2SIM" + "".join(rng.choice(chars) for _ in range(11))
+
+class ElmSession:
+    """One client's adapter state (AT settings, protocol) and the vehicle behind it."""
+    def __init__(self, simulator, vin, link):
+        self.simulator = simulator
+        self.vin = vin
+        self.link = link
+        dtcs = simulator.query(Command("GET_DTC")).value or []
+        self.stored_dtcs = [code for code, _ in dtcs]
+        # Answer 0100/0120/0140 for the polled PIDs and the next bitmap
+        self.pids = set(PIDS_BY_NUMBER) | {0x20, 0x40}
+        self.reset()
+
+    def reset(self):
+        self.echo = True
+        self.linefeeds = False
+        self.spaces = True
+        self.headers = False
+        self.protocol = "0"  # automatic
+        self.searched = False
+
+    # --- formatting ---
+
+    def _hex(self, data):
+        return (" " if self.spaces else "").join(f"{b:02X}" for b in data)
+
+    def _frames(self, payload):
+        """Formats one ECU message as ELM output lines, splitting it into CAN frames as needed."""
+        sep = " " if self.spaces else ""
+        if len(payload) <= 7:
+            if self.headers:
+                return [f"{ECU_HEADER}{sep}{self._hex(bytes([len(payload)]) + payload)}"]
+            return [self._hex(payload)]
+        chunks = [payload[:6]] + [payload[i:i + 7] for i in range(6, len(payload), 7)]
+        if self.headers:
+            first = bytes([0x10 | (len(payload) >> 8), len(payload) & 0xFF]) + chunks[0]
+            lines = [f"{ECU_HEADER}{sep}{self._hex(first)}"]
+            for n, chunk in enumerate(chunks[1:], 1):
+                lines.append(f"{ECU_HEADER}{sep}{self._hex(bytes([0x20 | (n & 0xF)]) + chunk)}")
+            return lines
+        # Headers off: ELM prints the byte count, then numbered frames
+        return [f"{len(payload):03X}"] + [f"{n & 0xF:X}:{sep}{self._hex(chunk)}" for n, chunk in enumerate(chunks)]
+
+    # --- commands ---
+
+    def at_command(self, cmd):
+        """Handles an AT command (without the AT), returning reply lines."""
+        if cmd in ("Z", "WS"):
+            self.reset()
+            return ["", ELM_VERSION]
+        if cmd in ("I", "@1"):
+            return [ELM_VERSION if cmd == "I" else "OBDII to RS232 Interpreter"]
+        if cmd == "RV":
+            return [f"{self.simulator.model.sample()['voltage']:.1f}V"]
+        if cmd == "DPN":
+            return [("A" if self.protocol == "0" else "") + (PROTOCOL if self.searched or self.protocol != "0" else "0")]
+        if cmd == "DP":
+            return [("AUTO, " if self.protocol == "0" else "") + PROTOCOL_NAME]
+        switch = {"E": "echo", "L": "linefeeds", "S": "spaces", "H": "headers"}
+        if len(cmd) == 2 and cmd[0] in switch and cmd[1] in "01":
+            setattr(self, switch[cmd[0]], cmd[1] == "1")
+            return ["OK"]
+        if cmd[:2] in ("SP", "TP"):
+            protocol = cmd[2:].lstrip("A") or "0"
+            self.protocol, self.searched = protocol, False
+            return ["OK"]
+        if cmd.startswith(ACCEPTED_AT_PREFIXES):
+            return ["OK"]
+        return ["?"]
+
+    def obd_request(self, cmd):
+        """Handles a hex OBD request, returning reply lines."""
+        if len(cmd) % 2:
+            cmd = cmd[:-1]  # trailing response count (e.g. "010C1"); one ECU answers anyway
+        try:
+            data = bytes.fromhex(cmd)
+        except ValueError:
+            return ["?"]
+        if not data:
+            return ["?"]
+        if self.protocol not in ("0", PROTOCOL):
+            return ["UNABLE TO CONNECT"]
+        lines = []
+        if not self.searched:
+            self.searched = True
+            if self.protocol == "0":
+                lines.append("SEARCHING...")
+        payload = self._service(data)
+        return lines + (self._frames(payload) if payload else ["NO DATA"])
+
+    def _service(self, data):
+        """The ECU's reply payload to a request, or None for NO DATA."""
+        mode = data[0]
+        if mode == 0x01 and 1 < len(data) <= 1 + MAX_PIDS_PER_REQUEST:
+            state = self.simulator.model.sample()
+            reply = bytearray([0x41])
+            for pid in data[1:]:
+                if pid in (0x00, 0x20, 0x40):
+                    reply += bytes([pid]) + _supported_bitmap(pid, self.pids)
+                elif pid in PIDS_BY_NUMBER:
+                    name = PIDS_BY_NUMBER[pid].name
+                    reply += bytes([pid]) + encode(name, PID_VALUES[name](state))
+            return bytes(reply) if len(reply) > 1 else None
+        if mode == 0x02 and len(data) in (2, 3):
+            return self._freeze_frame(data[1])
+        if mode == 0x03:
+            reply = bytearray([0x43, len(self.stored_dtcs)])
+            for code in self.stored_dtcs:
+                reply += encode_code(code).to_bytes(2, 'big')
+            return bytes(reply)
+        if mode == 0x04:
+            self.stored_dtcs = []
+            return b"\x44"
+        if mode == 0x09 and data[1:] == b"\x00":
+            return b"\x49\x00" + _supported_bitmap(0x00, {0x02})
+        if mode == 0x09 and data[1:] == b"\x02":
+            return b"\x49\x02\x01" + self.vin.encode()
+        return None
+
+    def _freeze_frame(self, pid):
+        """Mode 02 reply for one PID of freeze frame 0; there is none once the DTCs are cleared."""
+        frame = self.simulator.freeze_frame
+        if frame is None or not self.stored_dtcs:
+            return None
+        code, state = frame
+        if pid == 0x00:
+            data = _supported_bitmap(0x00, set(PIDS_BY_NUMBER) | {FREEZE_DTC_PID})
+        elif pid == FREEZE_DTC_PID:
+            data = encode_code(code).to_bytes(2, 'big')
+        elif pid in PIDS_BY_NUMBER:
+            name = PIDS_BY_NUMBER[pid].name
+            data = encode(name, PID_VALUES[name](state))
+        else:
+            return None
+        return bytes([0x42, pid, 0x00]) + data
+
+    def handle(self, line):
+        """Returns (reply lines, delay in seconds) for one command line from the client."""
+        cmd = line.replace(" ", "").upper()
+        if not cmd:
+            return [], 0.0  # a bare CR repeats the last command on a real ELM; nothing to repeat here
+        if cmd.startswith("AT"):
+            # A reset takes as long as the link profile's connect time
+            delay = self.link.connect_delay() if cmd in ("ATZ", "ATWS") else 0.0
+            return self.at_command(cmd[2:]), delay
+        outcome, delay = self.link.draw()
+        if outcome in (NO_DATA, TIMEOUT):
+            return ["NO DATA"], delay
+        lines = self.obd_request(cmd)
+        if outcome == GARBLED and lines:
+            # Drop a character from one line, the way a lost byte on the link does
+            i = self.link.rng.randrange(len(lines))
+            if lines[i]:
+                j = self.link.rng.randrange(len(lines[i]))
+                lines[i] = lines[i][:j] + lines[i][j + 1:]
+        return lines, delay
+
+class ElmEmulator:
+    """Asyncio TCP server; each connection is a separate adapter and vehicle."""
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, seed=None, link_profile="ideal"):
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self.link_profile = link_profile
+        self.clients = 0
+        self.active = 0
+        self.server = None
+
+    def new_session(self):
+        n = self.clients
+        self.clients += 1
+        seed = None if self.seed is None else self.seed + n
+        simulator = OBDSimulator(seed=seed, connect_delay=0, link_profile="ideal")
+        link = SimulatedLink(self.link_profile, seed=None if seed is None else f"{seed}:link")
+        return ElmSession(simulator, _make_vin(random.Random(seed)), link)
+
+    async def handle_client(self, reader, writer):
+        session = self.new_session()
+        self.active += 1
+        try:
+            buffer = b""
+            while True:
+                chunk = await reader.read(4096)
+                if not chunk:
+                    break
+                buffer += chunk
+                while b"\r" in buffer:
+                    raw, buffer = buffer.split(b"\r", 1)
+                    line = raw.decode("ascii", errors="replace").strip()
+                    lines, delay = session.handle(line)
+                    if delay:
+                        await asyncio.sleep(delay)
+                    eol = "\r\n" if session.linefeeds else "\r"
+                    out = (line + eol) if session.echo else ""
+                    out += "".join(reply + eol for reply in lines) + eol + ">"
+                    writer.write(out.encode("ascii"))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        # Port 0 picks a free port; report the real one
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=None, help="first client's vehicle seed (then +1 per client)")
+    parser.add_argument("--link", default="ideal", help="link profile applied to OBD requests")
+    args = parser.parse_args()
+    emulator = ElmEmulator(args.host, args.port, args.seed, args.link)
+
+    async def run():
+        await emulator.start()
+        print(f"ELM327 emulator listening on socket://{emulator.host}:{emulator.port} (link '{args.link}')")
+        await emulator.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
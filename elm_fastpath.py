@@ -0,0 +1,159 @@
+# elm_fastpath.py
+"""Response-count suffixes and ATST tuning for python-obd connections to an ELM327.
+
+python-obd's own `fast=True` mode appends a response count too, but it is not
+enough here: it takes the count from a command's first reply and trusts it
+forever, so an empty first reply makes it send a count of 0, a late extra ECU
+makes it cut replies short, and an ECU that stops answering is never relearned.
+It also appends the count to adapters older than v1.3, which reject it, and
+leaves ATST at its 200 ms default. The connection is opened with fast=False
+and ElmFastPath does this instead: a count is used only once it has been seen
+LEARN_SAMPLES times in a row, dropped when a fast request comes back empty,
+and ATST follows the measured latencies.
+"""
+import re
+import time
+
+# ELM327 v1.3+ accepts a trailing digit with the number of responses to wait for
+MIN_ELM_VERSION = (1, 3)
+MAX_RESPONSE_COUNT = 9
+# A frame count must be seen this many times in a row before we rely on it
+LEARN_SAMPLES = 2
+# Fast requests that come back empty this many times disable the fast path
+MAX_FAST_FAILURES = 3
+
+# ATST sets the response timeout in units of 4.096 ms. 0x32 (~200 ms) is the ELM327 default.
+ATST_UNIT = 0.004096
+ATST_DEFAULT = 0x32
+ATST_MIN = 0x0C
+ATST_WINDOW = 50    # fast-path latencies collected before each retune
+ATST_HEADROOM = 2.0  # timeout = headroom x 95th percentile latency
+
+def parse_elm_version(text):
+    """Extracts (major, minor) from an ATI reply such as "ELM327 v1.5"."""
+    match = re.search(r"v(\d+)\.(\d+)", text or "")
+    return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+class ResponseCountTuner:
+    """Learns how many frames each request returns and tunes ATST from measured latencies.
+
+    The tuner never talks to the adapter itself; the transport asks it what to send
+    (`build`), reports what came back (`observe`) and applies any new ATST value.
+    """
+    def __init__(self):
+        self.enabled = True
+        self.frame_counts = {}  # request -> number of frames the ECUs answer with
+        self.atst = ATST_DEFAULT
+        self._candidates = {}  # request -> (frame count, times seen in a row)
+        self._fast_failures = 0
+        self._window = []
+        # label -> [baseline count, baseline total s, fast count, fast total s]
+        self._latency = {}
+
+    def build(self, request):
+        """Returns the request with the expected response count appended, once learned."""
+        count = self.frame_counts.get(request) if self.enabled else None
+        return request + str(count).encode() if count else request
+
+    def observe(self, request, label, frames, latency, fast):
+        """Records the outcome of one request sent via `build`."""
+        stats = self._latency.setdefault(label, [0, 0.0, 0, 0.0])
+        if fast:
+            stats[2] += 1
+            stats[3] += latency
+            if frames == 0:
+                # The ECU stopped answering the way we learned; relearn this request
+                self.frame_counts.pop(request, None)
+                self._fast_failures += 1
+                if self._fast_failures >= MAX_FAST_FAILURES:
+                    self.enabled = False
+                return
+            self._fast_failures = 0
+            self._window.append(latency)
+            return
+
+        stats[0] += 1
+        stats[1] += latency
+        if not 0 < frames <= MAX_RESPONSE_COUNT:
+            self._candidates.pop(request, None)
+            return
+        count, seen = self._candidates.get(request, (frames, 0))
+        seen = seen + 1 if count == frames else 1
+        self._candidates[request] = (frames, seen)
+        if seen >= LEARN_SAMPLES:
+            self.frame_counts[request] = frames
+
+    def next_atst(self):
+        """Returns a new ATST value when the measured latencies call for one, else None."""
+        if len(self._window) < ATST_WINDOW:
+            return None
+        self._window.sort()
+        p95 = self._window[int(len(self._window) * 0.95) - 1]
+        self._window = []
+        atst = max(ATST_MIN, min(ATST_DEFAULT, int(p95 * ATST_HEADROOM / ATST_UNIT) + 1))
+        if atst == self.atst:
+            return None
+        self.atst = atst
+        return atst
+
+    def latency_report(self):
+        """Average latency in ms per label: {label: (without count, with count)}."""
+        report = {}
+        for label, (n_base, t_base, n_fast, t_fast) in self._latency.items():
+            report[label] = (t_base / n_base * 1000.0 if n_base else None,
+                             t_fast / n_fast * 1000.0 if n_fast else None)
+        return report
+
+class ElmFastPath:
+    """Wraps a python-obd connection and sends Mode 01 requests with the response-count suffix."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.interface = connection.interface
+        self.tuner = ResponseCountTuner()
+        self.tuner.enabled = self._elm_version() >= MIN_ELM_VERSION
+
+    def _elm_version(self):
+        messages = self.interface.send_and_parse(b"ATI") or []
+        return parse_elm_version(" ".join(m.raw() for m in messages))
+
+    def is_connected(self):
+        return self.connection.is_connected()
+
+    def protocol_id(self):
+        return self.connection.protocol_id()
+
+    def close(self):
+        self.connection.close()
+
+    def supported_pids(self):
+        """Mode 01 PIDs python-obd found in the bitmaps it read while connecting."""
+        return {cmd.pid for cmd in self.connection.supported_commands if cmd.mode == 1 and cmd.pid}
+
+    def read_vin(self):
+        import obd
+        response = self.connection.query(obd.commands.VIN)
+        if response.is_null():
+            return None
+        vin = response.value
+        return vin.decode('ascii', errors='ignore') if isinstance(vin, (bytes, bytearray)) else str(vin)
+
+    def query(self, cmd, force=False):
+        if cmd.mode != 1 or not self.tuner.enabled:
+            return self.connection.query(cmd, force=force)
+        if not self.is_connected() or (not force and not self.connection.test_cmd(cmd)):
+            return cmd([])
+
+        request = self.tuner.build(cmd.command)
+        start = time.perf_counter()
+        messages = self.interface.send_and_parse(request) or []
+        latency = time.perf_counter() - start
+
+        frames = sum(len(m.frames) for m in messages if m.data)
+        self.tuner.observe(cmd.command, cmd.name, frames, latency, fast=request != cmd.command)
+        atst = self.tuner.next_atst()
+        if atst is not None:
+            self.interface.send_and_parse(b"ATST%02X" % atst)
+        return cmd(messages)
+
+    def latency_report(self):
+        return self.tuner.latency_report()
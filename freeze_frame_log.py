@@ -0,0 +1,248 @@
+# freeze_frame_log.py
+"""Append-only freeze-frame log with a side index.
+
+Records are appended as JSON lines to freeze_frame_log.jsonl, so adding one costs
+the same however long the log is. A small side index (freeze_frame_log.idx, one
+line per record: offset, length, timestamp, VIN, DTCs) is kept in memory, so
+lookups by VIN, code or time read only the matching records from the log.
+
+Usage: py freeze_frame_log.py list [--vin VIN] [--dtc CODE] [--since ISO] [--page N]
+       py freeze_frame_log.py show NUMBER
+       py freeze_frame_log.py compact [--keep-days N] [--keep-last N]
+"""
+import argparse
+import json
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+LOG_FILE = 'freeze_frame_log.jsonl'
+PAGE_SIZE = 20
+# Records kept by trim(); the log is compacted once it holds a quarter more than that
+DEFAULT_KEEP = 500
+
+IndexEntry = namedtuple('IndexEntry', ['offset', 'length', 'timestamp', 'vin', 'dtcs'])
+
+def _entry(offset, line):
+    """Index entry for one log line; None if the line isn't a whole record (e.g. a torn write)."""
+    if not line.endswith(b"\n"):
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return IndexEntry(offset, len(line), record.get('timestamp') or "", record.get('vin'), record.get('dtcs') or [])
+
+def _index_line(entry):
+    return (json.dumps(list(entry), separators=(',', ':')) + "\n").encode('utf-8')
+
+class FreezeFrameLog:
+    """The freeze-frame log and its index. Records are numbered from 0 in the order they were added."""
+    def __init__(self, path=LOG_FILE, index_path=None):
+        self.path = path
+        self.index_path = index_path or os.path.splitext(path)[0] + ".idx"
+        self._load_index()
+
+    # --- index ---
+
+    def _load_index(self):
+        self.entries = []
+        self.by_vin = {}
+        self.by_dtc = {}
+        self.size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self._torn_tail = False
+        try:
+            with open(self.index_path, 'rb') as f:
+                for line in f:
+                    try:
+                        self._add(IndexEntry(*json.loads(line)))
+                    except (ValueError, TypeError):
+                        break  # torn index write; the tail is recovered from the log below
+        except OSError:
+            pass
+        end = self.entries[-1].offset + self.entries[-1].length if self.entries else 0
+        if end > self.size or not self._entry_matches_log(-1):
+            # The log was replaced or truncated under this index
+            self._rebuild_index(0)
+        elif end < self.size:
+            # Records were appended without their index lines (e.g. a crash in between)
+            self._rebuild_index(end, keep=True)
+
+    def _entry_matches_log(self, number):
+        if not self.entries:
+            return True
+        with open(self.path, 'rb') as f:
+            f.seek(self.entries[number].offset)
+            return _entry(self.entries[number].offset, f.read(self.entries[number].length)) == self.entries[number]
+
+    def _add(self, entry):
+        number = len(self.entries)
+        self.entries.append(entry)
+        if entry.vin:
+            self.by_vin.setdefault(entry.vin, []).append(number)
+        for code in entry.dtcs:
+            self.by_dtc.setdefault(code, []).append(number)
+
+    def _rebuild_index(self, start, keep=False):
+        """Scans the log from byte `start` and (re)writes the index lines for it."""
+        if not keep:
+            self.entries, self.by_vin, self.by_dtc = [], {}, {}
+        added = []
+        offset = start
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                for line in f:
+                    entry = _entry(offset, line)
+                    if entry is not None:
+                        self._add(entry)
+                        added.append(entry)
+                    offset += len(line)
+                    self._torn_tail = not line.endswith(b"\n")
+        with open(self.index_path, 'ab' if keep else 'wb') as f:
+            f.writelines(_index_line(entry) for entry in added)
+
+    # --- writing ---
+
+    def append(self, record):
+        """Appends one record; returns its number."""
+        line = (json.dumps(record, separators=(',', ':')) + "\n").encode('utf-8')
+        with open(self.path, 'ab') as f:
+            if self._torn_tail:
+                # Don't glue the new record onto a half-written one
+                f.write(b"\n")
+                self.size += 1
+                self._torn_tail = False
+            f.write(line)
+        entry = IndexEntry(self.size, len(line), record.get('timestamp') or "", record.get('vin'), record.get('dtcs') or [])
+        self.size += len(line)
+        with open(self.index_path, 'ab') as f:
+            f.write(_index_line(entry))
+        self._add(entry)
+        return len(self.entries) - 1
+
+    # --- reading ---
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, vin=None, dtc=None, since=None, until=None):
+        """Numbers of the matching records, oldest first. Only the index is consulted.
+
+        `since` and `until` are ISO timestamps (or prefixes such as "2025-06").
+        """
+        numbers = None
+        for postings in ((self.by_vin.get(vin, []) if vin else None),
+                         (self.by_dtc.get(dtc.upper(), []) if dtc else None)):
+            if postings is not None:
+                numbers = postings if numbers is None else sorted(set(numbers).intersection(postings))
+        if numbers is None:
+            numbers = range(len(self.entries))
+        entries = self.entries
+        return [n for n in numbers
+                if (since is None or entries[n].timestamp >= since)
+                and (until is None or entries[n].timestamp[:len(until)] <= until)]
+
+    def read(self, number, f=None):
+        """Reads one record from the log."""
+        entry = self.entries[number]
+        if f is None:
+            with open(self.path, 'rb') as f:
+                f.seek(entry.offset)
+                return json.loads(f.read(entry.length))
+        f.seek(entry.offset)
+        return json.loads(f.read(entry.length))
+
+    def records(self, numbers=None, newest_first=False):
+        """Yields (number, record) for the given record numbers (all by default), reading each on demand."""
+        numbers = range(len(self.entries)) if numbers is None else numbers
+        if not numbers:
+            return
+        with open(self.path, 'rb') as f:
+            for number in (reversed(numbers) if newest_first else numbers):
+                yield number, self.read(number, f)
+
+    def page(self, page=0, size=PAGE_SIZE, newest_first=True, **filters):
+        """One page of matching records as [(number, record)]; filters are those of find()."""
+        numbers = self.find(**filters)
+        if newest_first:
+            numbers = numbers[::-1]
+        return list(self.records(numbers[page * size:(page + 1) * size]))
+
+    def page_count(self, size=PAGE_SIZE, **filters):
+        return -(-len(self.find(**filters)) // size)
+
+    # --- maintenance ---
+
+    def compact(self, before=None, keep_last=None):
+        """Rewrites the log without records older than `before` (ISO), beyond the newest
+        `keep_last`, or torn.
+
+        Returns (kept, dropped). Record numbers change afterwards.
+        """
+        tmp_path = self.path + ".tmp"
+        first = len(self.entries) - keep_last if keep_last is not None else 0
+        kept = 0
+        with open(tmp_path, 'wb') as out:
+            for number, record in self.records():
+                if number < first or (before is not None and (record.get('timestamp') or "") < before):
+                    continue
+                out.write((json.dumps(record, separators=(',', ':')) + "\n").encode('utf-8'))
+                kept += 1
+            out.flush()
+            os.fsync(out.fileno())
+        dropped = len(self.entries) - kept
+        os.replace(tmp_path, self.path)
+        self.size = os.path.getsize(self.path)
+        self._rebuild_index(0)
+        return kept, dropped
+
+    def trim(self, keep=DEFAULT_KEEP):
+        """Keeps the log to about `keep` records (0 = no limit). Returns the number dropped.
+
+        Compacting only once a quarter more have piled up keeps appends O(1) on average.
+        """
+        if not keep or len(self.entries) <= keep + keep // 4:
+            return 0
+        return self.compact(keep_last=keep)[1]
+
+def summary(number, record):
+    dtcs = ", ".join(record.get('dtcs') or []) or "-"
+    return f"#{number}  {record.get('timestamp')}  VIN {record.get('vin') or '-'}  {record.get('trigger')}  DTCs: {dtcs}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", default=LOG_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="list records, newest first")
+    list_parser.add_argument("--vin")
+    list_parser.add_argument("--dtc")
+    list_parser.add_argument("--since", help="ISO timestamp or prefix, e.g. 2025-06")
+    list_parser.add_argument("--until")
+    list_parser.add_argument("--page", type=int, default=1)
+    show_parser = commands.add_parser("show", help="print one record")
+    show_parser.add_argument("number", type=int)
+    compact_parser = commands.add_parser("compact", help="drop old and damaged records")
+    compact_parser.add_argument("--keep-days", type=float, default=None, help="drop records older than this")
+    compact_parser.add_argument("--keep-last", type=int, default=None, help="keep only the newest N records")
+    args = parser.parse_args()
+
+    log = FreezeFrameLog(args.log)
+    if args.command == "list":
+        filters = dict(vin=args.vin, dtc=args.dtc, since=args.since, until=args.until)
+        for number, record in log.page(args.page - 1, **filters):
+            print(summary(number, record))
+        print(f"page {args.page} of {max(log.page_count(**filters), 1)}")
+    elif args.command == "show":
+        if not 0 <= args.number < len(log):
+            parser.error(f"no record #{args.number} ({len(log)} records)")
+        print(json.dumps(log.read(args.number), indent=2))
+    else:
+        before = None
+        if args.keep_days is not None:
+            before = (datetime.now() - timedelta(days=args.keep_days)).isoformat(timespec='seconds')
+        kept, dropped = log.compact(before, args.keep_last)
+        print(f"Compacted {args.log}: kept {kept} records, dropped {dropped}.")
+
+if __name__ == "__main__":
+    main()
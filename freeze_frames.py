@@ -0,0 +1,153 @@
+# freeze_frames.py
+"""Freeze-frame capture: a pre-trigger ring buffer per polled channel.
+
+Every published sample goes into a fixed-size ring (two preallocated float arrays
+per channel), so recording costs O(1) and allocates nothing per sample. When a
+trigger fires (a new DTC, or a user rule such as ``temp>105``) the engine waits
+`post_seconds`, then copies the last pre+post seconds of every channel into a
+freeze-frame record and hands it to the sink.
+"""
+import math
+import re
+import time
+from array import array
+from datetime import datetime
+
+DEFAULT_PRE_SECONDS = 10.0
+DEFAULT_POST_SECONDS = 5.0
+# Ring headroom over the nominal poll rate (rates drift, batches arrive together)
+RING_HEADROOM = 1.5
+
+TRIGGER_RULE = re.compile(r"^\s*(.+?)\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+COMPARISONS = {
+    '>': lambda value, limit: value > limit,
+    '>=': lambda value, limit: value >= limit,
+    '<': lambda value, limit: value < limit,
+    '<=': lambda value, limit: value <= limit,
+}
+
+class SampleRing:
+    """Fixed-capacity ring of (timestamp, value) pairs backed by two float arrays."""
+    __slots__ = ('times', 'values', 'capacity', 'next', 'count')
+
+    def __init__(self, capacity):
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.capacity = capacity
+        self.next = 0
+        self.count = 0
+
+    def append(self, t, value):
+        i = self.next
+        self.times[i] = t
+        self.values[i] = value
+        self.next = i + 1 if i + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def window(self, start, end):
+        """[(t, value)] with start <= t <= end, oldest first."""
+        first = (self.next - self.count) % self.capacity
+        samples = []
+        for n in range(self.count):
+            i = (first + n) % self.capacity
+            t = self.times[i]
+            if start <= t <= end:
+                samples.append((t, self.values[i]))
+        return samples
+
+def parse_trigger_rules(text):
+    """Parses "temp>105, rpm>=9000" into [(rule text, channel, comparison, limit)]."""
+    rules = []
+    for part in (text or "").split(","):
+        if not part.strip():
+            continue
+        match = TRIGGER_RULE.match(part)
+        if not match:
+            print(f"Ignoring freeze-frame trigger '{part.strip()}' (expected e.g. temp>105)")
+            continue
+        channel, op, limit = match.groups()
+        rules.append((part.strip(), channel, COMPARISONS[op], float(limit)))
+    return rules
+
+class FreezeFrameEngine:
+    """Keeps the recent history of every channel and turns triggers into freeze-frame records.
+
+    `on_sample` is the sample sink hook; call it for every published value.
+    `channel_rates` ({channel: Hz}) sizes the rings to hold pre+post seconds, and
+    `sink` receives each finished record (e.g. FreezeFrameLog.append).
+    """
+    def __init__(self, channel_rates, sink, pre_seconds=DEFAULT_PRE_SECONDS,
+                 post_seconds=DEFAULT_POST_SECONDS, rules=(), vin=None, clock=time.monotonic):
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.sink = sink
+        self.vin = vin
+        self.clock = clock
+        span = pre_seconds + post_seconds
+        self.rings = {name: SampleRing(max(8, math.ceil(rate * span * RING_HEADROOM)))
+                      for name, rate in channel_rates.items()}
+        self.rules = {}
+        for rule in rules:
+            self.rules.setdefault(rule[1], []).append(rule)
+        self._armed = {rule[0]: True for rule in rules}
+        self.pending = []
+        self.captured = 0
+
+    def on_sample(self, channel, t, value):
+        ring = self.rings.get(channel)
+        if ring is None or value is None:
+            return
+        ring.append(t, value)
+        for text, _, compare, limit in self.rules.get(channel, ()):
+            # Fire on the rising edge only; re-arm once the condition clears
+            if compare(value, limit):
+                if self._armed[text]:
+                    self._armed[text] = False
+                    self.trigger(text, t)
+            else:
+                self._armed[text] = True
+        if self.pending and t >= self.pending[0]['due']:
+            self._finish_due(t)
+
+    def trigger(self, reason, t=None, dtcs=None):
+        """Starts a capture around time t (now by default). Returns the pending capture."""
+        t = self.clock() if t is None else t
+        for capture in self.pending:
+            if capture['reason'] == reason:
+                return capture  # already capturing for this
+        capture = {'reason': reason, 't': t, 'due': t + self.post_seconds,
+                   'wall': time.time(), 'dtcs': list(dtcs or []), 'ecu_freeze_frame': None}
+        self.pending.append(capture)
+        return capture
+
+    def attach_ecu_frame(self, capture, frame):
+        """Adds the ECU's own (Mode 02) freeze frame to a capture returned by trigger(), if it's still pending."""
+        if frame and any(pending is capture for pending in self.pending):
+            capture['ecu_freeze_frame'] = frame
+
+    def _finish_due(self, now):
+        while self.pending and now >= self.pending[0]['due']:
+            self._finish(self.pending.pop(0))
+
+    def flush(self):
+        """Finishes every pending capture with what has been recorded so far (e.g. at session end)."""
+        while self.pending:
+            self._finish(self.pending.pop(0))
+
+    def _finish(self, capture):
+        t = capture['t']
+        record = {
+            'timestamp': datetime.fromtimestamp(capture['wall']).isoformat(timespec='seconds'),
+            'vin': self.vin,
+            'trigger': capture['reason'],
+            'dtcs': capture['dtcs'],
+            'pre_seconds': self.pre_seconds,
+            'post_seconds': self.post_seconds,
+            # Sample times are relative to the trigger, so negative means before it
+            'channels': {name: [[round(st - t, 3), value] for st, value in ring.window(t - self.pre_seconds, t + self.post_seconds)]
+                         for name, ring in self.rings.items()},
+            'ecu_freeze_frame': capture['ecu_freeze_frame'],
+        }
+        self.captured += 1
+        self.sink(record)
@@ -4,11 +4,16 @@ from tkinter import messagebox, filedialog
 import threading
 import time
 import webbrowser
-from diagnostics import run_diagnostics_thread
+from async_engine import run_engine_thread
 from custom_widgets import Gauge
-from dtc_database import DTC_CODES 
+from dtc_index import DTC_CODES
+from dtc_search import get_search_index, MAX_RESULTS
+from dtc_overlays import codes_for_brand
+from dtc_sqlite import get_sqlite_store
 from simulator import OBDSimulator
 from config_manager import load_settings, save_settings
+from ui_queue import UiMailbox, DEFAULT_FPS
+from session_journal import recover_journals
 
 class ToplevelSettings(customtkinter.CTkToplevel):
     def __init__(self, master, current_settings, *args, **kwargs):
@@ -16,14 +21,15 @@ class ToplevelSettings(customtkinter.CTkToplevel):
         self.transient(master)
         self.grab_set()
         self.title("Settings")
-        self.geometry("400x250")
+        self.geometry("400x370")
         self.resizable(False, False)
+        self.current_settings = current_settings
 
         self.label_mode = customtkinter.CTkLabel(self, text="Connection Mode:")
         self.label_mode.pack(padx=20, pady=(20, 5))
         
         self.mode_var = customtkinter.StringVar(value=current_settings.get('connection_mode'))
-        self.mode_menu = customtkinter.CTkOptionMenu(self, variable=self.mode_var, values=["Simulator", "Wi-Fi", "Bluetooth"])
+        self.mode_menu = customtkinter.CTkOptionMenu(self, variable=self.mode_var, values=["Simulator", "Wi-Fi", "Bluetooth", "Replay"])
         self.mode_menu.pack(padx=20, pady=5)
 
         self.label_address = customtkinter.CTkLabel(self, text="Address (IP:Port or COM Port):")
@@ -33,41 +39,106 @@ class ToplevelSettings(customtkinter.CTkToplevel):
         self.address_entry.pack(padx=20, pady=5)
         self.address_entry.insert(0, current_settings.get('address'))
 
+        self.label_replay = customtkinter.CTkLabel(self, text="Replay Recording (Replay mode):")
+        self.label_replay.pack(padx=20, pady=(10, 5))
+
+        self.replay_frame = customtkinter.CTkFrame(self, fg_color="transparent")
+        self.replay_frame.pack(padx=20, pady=5)
+        self.replay_entry = customtkinter.CTkEntry(self.replay_frame, placeholder_text="recordings/session-....jsonl", width=170)
+        self.replay_entry.pack(side="left", padx=(0, 5))
+        self.replay_entry.insert(0, current_settings.get('replay_file', ''))
+        self.replay_speed_entry = customtkinter.CTkEntry(self.replay_frame, placeholder_text="speed", width=45)
+        self.replay_speed_entry.pack(side="left", padx=(0, 5))
+        self.replay_speed_entry.insert(0, current_settings.get('replay_speed', '1'))
+        self.browse_button = customtkinter.CTkButton(self.replay_frame, text="Browse", width=60, command=self.browse_recording)
+        self.browse_button.pack(side="left")
+
         self.save_button = customtkinter.CTkButton(self, text="Save Settings", command=self.save_and_close)
         self.save_button.pack(padx=20, pady=20)
 
+    def browse_recording(self):
+        file_path = filedialog.askopenfilename(
+            title="Choose a session recording",
+            filetypes=[("Session recordings", "*.jsonl *.jsonl.gz"), ("All files", "*.*")])
+        if file_path:
+            self.replay_entry.delete(0, "end")
+            self.replay_entry.insert(0, file_path)
+
     def save_and_close(self):
-        new_settings = {
+        # Keep settings that have no widget here (e.g. transport) as they are in the file
+        new_settings = dict(self.current_settings)
+        new_settings.update({
             'connection_mode': self.mode_var.get(),
-            'address': self.address_entry.get()
-        }
+            'address': self.address_entry.get(),
+            'replay_file': self.replay_entry.get(),
+            'replay_speed': self.replay_speed_entry.get() or '1'
+        })
         save_settings(new_settings)
         messagebox.showinfo("Settings Saved", "Settings have been saved successfully.")
         self.destroy()
 
 class ToplevelDTC(customtkinter.CTkToplevel):
-    def __init__(self, master, all_codes, *args, **kwargs): 
+    # Wait this long after the last keystroke before searching
+    SEARCH_DEBOUNCE_MS = 120
+
+    def __init__(self, master, all_codes, search_index=None, *args, **kwargs): 
         super().__init__(master, *args, **kwargs)
         self.transient(master)
         self.grab_set()
         self.all_codes = all_codes
+        if search_index is None and all_codes:
+            search_index = get_search_index(all_codes)
+        self.search_index = search_index
+        self._pending_search = None
         self.title("DTC Code Lookup")
-        self.geometry("400x200")
+        self.geometry("520x460")
         self.resizable(False, False)
         self.after(250, lambda: self.iconbitmap(''))
 
-        self.label = customtkinter.CTkLabel(self, text="Enter DTC Code (e.g., P0401):")
+        self.label = customtkinter.CTkLabel(self, text="Enter a DTC code (e.g., P0401) or words from its description:")
         self.label.pack(padx=20, pady=(20, 5))
 
-        self.entry = customtkinter.CTkEntry(self, placeholder_text="P0XXX")
+        self.entry = customtkinter.CTkEntry(self, placeholder_text="P0XXX or e.g. camshaft timing bank 2", width=320)
         self.entry.pack(padx=20, pady=5)
         self.entry.bind("<Return>", self.search_code)
+        self.entry.bind("<KeyRelease>", self.schedule_search)
 
         self.search_button = customtkinter.CTkButton(self, text="Search", command=self.search_code)
         self.search_button.pack(padx=20, pady=5)
 
-        self.result_label = customtkinter.CTkLabel(self, text="", wraplength=350)
-        self.result_label.pack(padx=20, pady=(10, 20))
+        self.result_label = customtkinter.CTkLabel(self, text="", wraplength=460)
+        self.result_label.pack(padx=20, pady=(10, 5))
+
+        self.results_text = customtkinter.CTkTextbox(self, state="disabled", font=("Consolas", 12), height=240, width=480)
+        self.results_text.pack(padx=20, pady=(0, 20))
+
+    def schedule_search(self, event=None):
+        """Debounces search-as-you-type so fast typing only runs the last query."""
+        if event is not None and event.keysym == "Return":
+            return
+        if self._pending_search is not None:
+            self.after_cancel(self._pending_search)
+        self._pending_search = self.after(self.SEARCH_DEBOUNCE_MS, self.search_incremental)
+
+    def search_incremental(self):
+        self._pending_search = None
+        query = self.entry.get().strip()
+        if not query or self.search_index is None:
+            self.show_results([])
+            self.result_label.configure(text="")
+            return
+        results = self.search_index.search(query, limit=MAX_RESULTS)
+        self.show_results(results)
+        if results:
+            self.result_label.configure(text=f"Showing {len(results)}{'+' if len(results) == MAX_RESULTS else ''} matches", text_color="white")
+        else:
+            self.result_label.configure(text=f"No codes match '{query}'.", text_color="orange")
+
+    def show_results(self, results):
+        self.results_text.configure(state="normal")
+        self.results_text.delete("1.0", "end")
+        self.results_text.insert("end", "".join(f"{code}: {desc}\n" for code, desc in results))
+        self.results_text.configure(state="disabled")
 
     def search_code(self, event=None):
         code = self.entry.get().strip().upper()
@@ -79,8 +150,10 @@ class ToplevelDTC(customtkinter.CTkToplevel):
             description = self.all_codes.get(code)
             if description:
                 self.result_label.configure(text=f"{code}: {description}", text_color="white")
+                self.show_results([(code, description)])
             else:
-                self.result_label.configure(text=f"Code '{code}' not found in database.", text_color="orange")
+                # Not an exact code; fall back to the code-prefix / description search
+                self.search_incremental()
         else:
             self.result_label.configure(text="DTC database is not loaded.", text_color="red")
 # ===================================================================
@@ -100,8 +173,31 @@ class App(customtkinter.CTk):
         self.bind("<F11>", self.toggle_fullscreen)
         self.dtc_widgets = [] # To keep track of DTC result widgets
 
+        try:
+            fps = float(self.settings.get('ui_fps', DEFAULT_FPS))
+            self.gauge_damping = float(self.settings.get('gauge_damping', 0.75))
+        except ValueError:
+            fps, self.gauge_damping = DEFAULT_FPS, 0.75
+        self.ui_frame_ms = max(1, int(1000 / max(fps, 1)))
+        self.pause_gauges_unfocused = self.settings.get('pause_gauges_unfocused', 'yes').lower() in ('yes', 'true', '1', 'on')
+        self._dtc_store = None
+
         self.create_widgets()
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+        # All updates from the diagnostics thread go through this mailbox and are
+        # applied on the Tk thread once per frame
+        self.ui_mailbox = UiMailbox({
+            'status': self.update_status, 'output': self.update_output,
+            'error': messagebox.showerror, 'reset_buttons': self.reset_buttons,
+            'update_secondary_data': self.update_secondary_data,
+            'display_dtcs': self.display_dtc_results
+        }, latest_wins={'status', 'update_secondary_data'})
+        self.after(self.ui_frame_ms, self.drain_ui_mailbox)
+
+        # Sessions cut short by a crash left their journal behind; rebuild their recordings
+        for path, samples in recover_journals():
+            self.update_output(f"Recovered {samples} samples of an interrupted session into {path}\n")
         
     def create_widgets(self):
         self.grid_columnconfigure(0, weight=1)
@@ -134,13 +230,16 @@ class App(customtkinter.CTk):
         gauge_frame.grid_columnconfigure((0, 1), weight=1)
         gauge_frame.grid_rowconfigure((0, 1), weight=1)
 
-        self.rpm_gauge = Gauge(gauge_frame, label="ENGINE SPEED", min_value=0, max_value=8000, unit="RPM")
+        # Gauges animate on their own frame loop; samples just move their target
+        gauge_options = {'frame_rate': 1000 / self.ui_frame_ms, 'damping': self.gauge_damping,
+                         'pause_when_unfocused': self.pause_gauges_unfocused}
+        self.rpm_gauge = Gauge(gauge_frame, label="ENGINE SPEED", min_value=0, max_value=8000, unit="RPM", **gauge_options)
         self.rpm_gauge.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-        self.speed_gauge = Gauge(gauge_frame, label="VEHICLE SPEED", min_value=0, max_value=120, unit="KPH")
+        self.speed_gauge = Gauge(gauge_frame, label="VEHICLE SPEED", min_value=0, max_value=120, unit="KPH", **gauge_options)
         self.speed_gauge.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
-        self.temp_gauge = Gauge(gauge_frame, label="COOLANT TEMP", min_value=0, max_value=120, unit="°C")
+        self.temp_gauge = Gauge(gauge_frame, label="COOLANT TEMP", min_value=0, max_value=120, unit="°C", **gauge_options)
         self.temp_gauge.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
-        self.load_gauge = Gauge(gauge_frame, label="ENGINE LOAD", min_value=0, max_value=100, unit="%")
+        self.load_gauge = Gauge(gauge_frame, label="ENGINE LOAD", min_value=0, max_value=100, unit="%", **gauge_options)
         self.load_gauge.grid(row=1, column=1, padx=10, pady=10, sticky="nsew")
 
         secondary_data_frame = customtkinter.CTkFrame(self)
@@ -182,23 +281,44 @@ class App(customtkinter.CTk):
         config = {
             'brand': self.brand_combobox.get(),
             'connection_mode': self.settings.get('connection_mode'),
-            'address': self.settings.get('address')
+            'address': self.settings.get('address'),
+            'transport': self.settings.get('transport'),
+            'sim_seed': self.settings.get('sim_seed', ''),
+            'sim_link_profile': self.settings.get('sim_link_profile', 'ideal'),
+            'record_sessions': self.settings.get('record_sessions', 'yes'),
+            'recordings_keep': self.settings.get('recordings_keep', '20'),
+            'record_columns': self.settings.get('record_columns', 'yes'),
+            'journal_sessions': self.settings.get('journal_sessions', 'yes'),
+            'journal_fsync': self.settings.get('journal_fsync', 'interval:1'),
+            'replay_file': self.settings.get('replay_file', ''),
+            'replay_speed': self.settings.get('replay_speed', '1'),
+            'freeze_frames': self.settings.get('freeze_frames', 'yes'),
+            'freeze_log_keep': self.settings.get('freeze_log_keep', '500'),
+            'freeze_pre_seconds': self.settings.get('freeze_pre_seconds', '10'),
+            'freeze_post_seconds': self.settings.get('freeze_post_seconds', '5'),
+            'freeze_triggers': self.settings.get('freeze_triggers', '')
         }
         
-        callbacks = {
-            'status': self.update_status, 'output': self.update_output,
-            'error': messagebox.showerror, 'reset_buttons': self.reset_buttons,
-            'update_rpm': self.rpm_gauge.update_value,
-            'update_speed': self.speed_gauge.update_value,
-            'update_temp': self.temp_gauge.update_value,
-            'update_load': self.load_gauge.update_value,
-            'update_secondary_data': self.update_secondary_data,
-            'display_dtcs': self.display_dtc_results
-        }
+        callbacks = self.ui_mailbox.callbacks()
+        # Gauge targets are plain attribute writes, so the worker sets them directly
+        callbacks.update({
+            'update_rpm': self.rpm_gauge.set_target,
+            'update_speed': self.speed_gauge.set_target,
+            'update_temp': self.temp_gauge.set_target,
+            'update_load': self.load_gauge.set_target
+        })
         
-        diag_thread = threading.Thread(target=run_diagnostics_thread, args=(config, callbacks, self.stop_thread), daemon=True)
+        diag_thread = threading.Thread(target=run_engine_thread, args=(config, callbacks, self.stop_thread), daemon=True)
         diag_thread.start()
 
+    def drain_ui_mailbox(self):
+        """Applies the pending updates from the diagnostics thread, then schedules the next frame."""
+        try:
+            self.ui_mailbox.drain()
+        finally:
+            # Keep the GUI receiving updates whatever happened in this frame
+            self.after(self.ui_frame_ms, self.drain_ui_mailbox)
+
     def update_secondary_data(self, data_string):
         self.secondary_data_label.configure(text=data_string)
 
@@ -211,7 +331,12 @@ class App(customtkinter.CTk):
         # Update the main log
         self.update_output("🚨 Found Trouble Codes! 🚨\n", False)
 
+        # Prefer the selected brand's description (e.g. for manufacturer P1xxx codes)
+        brand_codes = codes_for_brand(self.brand_combobox.get())
+        store = self.dtc_store()
+        generic = store.lookup_many([code for code, _ in dtc_list]) if store else {}
         for code, desc in dtc_list:
+            desc = brand_codes.overlay.get(code) or generic.get(code) or brand_codes.get(code) or desc
             # Create a frame for each DTC
             entry_frame = customtkinter.CTkFrame(self.dtc_scrollable_frame)
             entry_frame.pack(fill="x", padx=5, pady=5)
@@ -243,10 +368,24 @@ class App(customtkinter.CTk):
         self.attributes("-fullscreen", self.fullscreen_state)
         return "break"
 
+    def dtc_store(self):
+        """The SQLite DTC store if settings ask for it (dtc_backend = sqlite), else None."""
+        if self._dtc_store is None and self.settings.get('dtc_backend', 'index').lower() == 'sqlite':
+            try:
+                self._dtc_store = get_sqlite_store()
+            except (RuntimeError, OSError) as e:
+                print(f"SQLite DTC store unavailable, using the built-in index: {e}")
+                self.settings['dtc_backend'] = 'index'
+        return self._dtc_store
+
     def open_dtc_lookup_window(self):
         if DTC_CODES:
-            # Pass the imported dictionary directly to the lookup window
-            ToplevelDTC(self, all_codes=DTC_CODES)
+            # Look up against the selected brand's codes layered over the generic database
+            brand_codes = codes_for_brand(self.brand_combobox.get())
+            store = self.dtc_store()
+            # The SQLite store searches the generic codes; brand overlays need the in-memory index
+            search_index = store if store and not brand_codes.overlay else None
+            ToplevelDTC(self, all_codes=brand_codes, search_index=search_index)
         else:
             messagebox.showerror("Error", "DTC database could not be loaded.")
             
@@ -263,6 +402,8 @@ class App(customtkinter.CTk):
     def reset_buttons(self):
         self.connect_button.configure(state="normal")
         self.disconnect_button.configure(state="disabled")
+        stats = self.ui_mailbox.stats()
+        self.update_output(f"UI updates: {stats['posted']} posted, {stats['coalesced']} coalesced, {stats['dropped']} dropped\n")
 
     def stop_diagnostics(self):
         if not self.stop_thread.is_set():
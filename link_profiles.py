@@ -0,0 +1,100 @@
+# link_profiles.py
+"""Adapter link behaviour for the simulator: latency, dropped answers and stalls.
+
+Each profile models one kind of adapter. Per request it draws a latency from a
+lognormal distribution and may turn the answer into NO DATA, a timeout (the host
+waits out its read timeout), a garbled frame that can't be parsed, or an adapter
+buffer stall that delays the answer. Connecting (pairing, adapter reset, protocol
+search) takes its own drawn time. Pick one with `sim_link_profile` in settings.ini.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+
+LinkProfile = namedtuple('LinkProfile', [
+    'name',
+    'median_ms',      # typical request/response latency
+    'jitter',         # lognormal sigma; bigger means a longer tail
+    'p_no_data',      # chance the ECU/adapter answers NO DATA
+    'p_timeout',      # chance no answer arrives at all
+    'timeout_s',      # how long the host waits before giving up
+    'p_garbled',      # chance the frame arrives corrupted
+    'p_stall',        # chance the adapter's buffer stalls before answering
+    'stall_s',        # (min, max) stall duration
+    'connect_s',      # (min, max) time to open the link and initialize the adapter
+])
+
+LINK_PROFILES = {profile.name: profile for profile in [
+    LinkProfile('ideal', 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, (0.0, 0.0), (0.0, 0.0)),
+    LinkProfile('usb-ftdi', 25.0, 0.2, 0.002, 0.0005, 1.0, 0.0005, 0.0, (0.0, 0.0), (0.3, 0.6)),
+    LinkProfile('bt-classic', 60.0, 0.35, 0.01, 0.003, 2.0, 0.005, 0.005, (0.3, 1.2), (1.5, 4.0)),
+    LinkProfile('wifi-cheap-clone', 45.0, 0.6, 0.02, 0.01, 2.0, 0.02, 0.01, (0.5, 2.5), (0.5, 2.0)),
+]}
+DEFAULT_PROFILE = 'ideal'
+
+# What happened to a request
+OK, NO_DATA, TIMEOUT, GARBLED = 'ok', 'no_data', 'timeout', 'garbled'
+
+def get_link_profile(name):
+    """The named profile; unknown names fall back to the ideal link."""
+    profile = LINK_PROFILES.get((name or DEFAULT_PROFILE).strip().lower())
+    if profile is None:
+        print(f"Unknown link profile '{name}', using '{DEFAULT_PROFILE}'. "
+              f"Choose from: {', '.join(LINK_PROFILES)}")
+        profile = LINK_PROFILES[DEFAULT_PROFILE]
+    return profile
+
+class SimulatedLink:
+    """Applies a link profile to each request: waits the drawn delay and reports the outcome."""
+    def __init__(self, profile, seed=None, sleep=time.sleep):
+        self.profile = get_link_profile(profile) if isinstance(profile, str) else profile
+        self.rng = random.Random(seed)
+        self.sleep = sleep
+        self.counts = {OK: 0, NO_DATA: 0, TIMEOUT: 0, GARBLED: 0}
+        self.stalls = 0
+        self.waited = 0.0
+
+    def connect_delay(self):
+        """Draws how long connecting takes on this link, in seconds."""
+        low, high = self.profile.connect_s
+        return self.rng.uniform(low, high) if high else 0.0
+
+    def transfer(self):
+        """Simulates one request/response, blocking for its delay. Returns OK, NO_DATA, TIMEOUT or GARBLED."""
+        outcome, delay = self.draw()
+        if delay:
+            self.sleep(delay)
+        return outcome
+
+    def draw(self):
+        """Draws one request's (outcome, delay in seconds) without waiting, for callers that sleep themselves."""
+        p = self.profile
+        rng = self.rng
+        roll = rng.random()
+        if roll < p.p_timeout:
+            outcome, delay = TIMEOUT, p.timeout_s
+        else:
+            delay = rng.lognormvariate(math.log(p.median_ms), p.jitter) / 1000.0 if p.median_ms else 0.0
+            roll -= p.p_timeout
+            if roll < p.p_no_data:
+                outcome = NO_DATA
+            elif roll < p.p_no_data + p.p_garbled:
+                outcome = GARBLED
+            else:
+                outcome = OK
+            if p.p_stall and rng.random() < p.p_stall:
+                self.stalls += 1
+                delay += rng.uniform(*p.stall_s)
+        self.counts[outcome] += 1
+        self.waited += delay
+        return outcome, delay
+
+    def report(self):
+        requests = sum(self.counts.values())
+        if not requests:
+            return f"Link '{self.profile.name}': no requests yet"
+        failed = requests - self.counts[OK]
+        return (f"Link '{self.profile.name}': {requests} requests, {failed} failed "
+                f"({self.counts[NO_DATA]} NO DATA, {self.counts[TIMEOUT]} timeouts, {self.counts[GARBLED]} garbled), "
+                f"{self.stalls} stalls, {self.waited / requests * 1000:.1f} ms mean latency")
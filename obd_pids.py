@@ -0,0 +1,89 @@
+# obd_pids.py
+from collections import namedtuple
+
+# A Mode 01 PID: python-obd command name, PID number, data byte count,
+# decoder (data bytes -> float) and unit.
+Pid = namedtuple('Pid', ['name', 'pid', 'size', 'decode', 'unit'])
+
+MODE01_PIDS = {p.name: p for p in [
+    Pid('ENGINE_LOAD', 0x04, 1, lambda d: d[0] * 100.0 / 255.0, '%'),
+    Pid('COOLANT_TEMP', 0x05, 1, lambda d: d[0] - 40.0, '°C'),
+    Pid('INTAKE_PRESSURE', 0x0B, 1, lambda d: float(d[0]), 'kPa'),
+    Pid('RPM', 0x0C, 2, lambda d: (d[0] * 256 + d[1]) / 4.0, 'rpm'),
+    Pid('SPEED', 0x0D, 1, lambda d: float(d[0]), 'km/h'),
+    Pid('INTAKE_TEMP', 0x0F, 1, lambda d: d[0] - 40.0, '°C'),
+    Pid('CONTROL_MODULE_VOLTAGE', 0x42, 2, lambda d: (d[0] * 256 + d[1]) / 1000.0, 'V'),
+]}
+
+PIDS_BY_NUMBER = {p.pid: p for p in MODE01_PIDS.values()}
+
+def request_bytes(names):
+    """Builds a (possibly multi-PID) Mode 01 request, e.g. b"010C0D05"."""
+    return b"01" + "".join(f"{MODE01_PIDS[name].pid:02X}" for name in names).encode()
+
+def decode(name, data):
+    """Decodes the data bytes of a single PID (without the mode/PID header)."""
+    pid = MODE01_PIDS[name]
+    if len(data) < pid.size:
+        return None
+    return pid.decode(data[:pid.size])
+
+# Value of one step of the raw data, so recorded values can be stored as integers
+RESOLUTIONS = {
+    'ENGINE_LOAD': 100.0 / 255.0,
+    'COOLANT_TEMP': 1.0,
+    'INTAKE_PRESSURE': 1.0,
+    'RPM': 0.25,
+    'SPEED': 1.0,
+    'INTAKE_TEMP': 1.0,
+    'CONTROL_MODULE_VOLTAGE': 0.001,
+}
+
+# Inverse of the decoders: value -> raw data bytes, as an ECU would send them
+ENCODERS = {
+    'ENGINE_LOAD': lambda v: [round(v * 255.0 / 100.0)],
+    'COOLANT_TEMP': lambda v: [round(v + 40)],
+    'INTAKE_PRESSURE': lambda v: [round(v)],
+    'RPM': lambda v: divmod(round(v * 4), 256),
+    'SPEED': lambda v: [round(v)],
+    'INTAKE_TEMP': lambda v: [round(v + 40)],
+    'CONTROL_MODULE_VOLTAGE': lambda v: divmod(round(v * 1000), 256),
+}
+
+def encode(name, value):
+    """Encodes a value into the data bytes of a single PID, clamped to its range."""
+    limit = 256 ** MODE01_PIDS[name].size - 1
+    raw = ENCODERS[name](value)
+    if len(raw) == 2:
+        raw = divmod(min(max(raw[0] * 256 + raw[1], 0), limit), 256)
+    return bytes(min(max(b, 0), 255) for b in raw)
+
+def split_multi_pid_response(data):
+    """Splits a Mode 01 response (41 PID A [B] PID A [B] ...) into {name: value}.
+
+    Parsing stops at the first PID we don't know the length of, since the
+    rest of the payload can't be aligned after that.
+    """
+    values = {}
+    if not data or data[0] != 0x41:
+        return values
+    i = 1
+    while i < len(data):
+        pid = PIDS_BY_NUMBER.get(data[i])
+        if pid is None or i + 1 + pid.size > len(data):
+            break
+        values[pid.name] = pid.decode(data[i + 1:i + 1 + pid.size])
+        i += 1 + pid.size
+    return values
+
+def decode_supported_pids(base, data):
+    """Decodes a 4-byte "PIDs supported [base+1 - base+32]" bitmap into a set of PID numbers."""
+    supported = set()
+    for i in range(min(len(data), 4) * 8):
+        if data[i // 8] & (0x80 >> (i % 8)):
+            supported.add(base + i + 1)
+    return supported
+
+def decode_vin(data):
+    """Decodes the VIN text from Mode 09 PID 02 data, dropping padding."""
+    return data.decode('ascii', errors='ignore').strip('\x00\x01\x02 ')[-17:] or None
@@ -0,0 +1,255 @@
+# raw_elm327.py
+import re
+import socket
+import time
+from obd_pids import MODE01_PIDS, decode, decode_supported_pids, decode_vin, request_bytes, split_multi_pid_response
+from elm_fastpath import ResponseCountTuner, parse_elm_version, MIN_ELM_VERSION
+
+PROMPT = b">"
+DEFAULT_BAUDRATE = 38400
+# Replies that mean "no usable data" rather than a hex payload
+ERROR_REPLIES = ("NO DATA", "UNABLE TO CONNECT", "CAN ERROR", "BUS ERROR", "BUS INIT", "STOPPED", "?", "ERROR")
+CAN_PROTOCOL_IDS = {"6", "7", "8", "9"}
+DTC_LETTERS = "PCBU"
+# Mode 02 PID 02: the DTC that caused the freeze frame to be stored
+FREEZE_DTC_PID = 0x02
+
+class RawResponse:
+    """Minimal stand-in for python-obd's OBDResponse, carrying plain values."""
+    def __init__(self, value=None, lines=None):
+        self.value = value
+        self.lines = lines or []
+    def is_null(self):
+        return self.value is None
+
+class TcpLink:
+    """Byte link to a Wi-Fi adapter."""
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.timeout = timeout
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def read_until_prompt(self, timeout):
+        self.sock.settimeout(timeout)
+        buffer = b""
+        while not buffer.endswith(PROMPT):
+            try:
+                chunk = self.sock.recv(4096)
+            except socket.timeout:
+                break
+            if not chunk:
+                break
+            buffer += chunk
+        return buffer
+
+    def close(self):
+        self.sock.close()
+
+class SerialLink:
+    """Byte link to a USB or Bluetooth (RFCOMM/COM port) adapter."""
+    def __init__(self, port, baudrate, timeout):
+        import serial  # installed alongside python-obd
+        self.port = serial.Serial(port, baudrate=baudrate, timeout=timeout, write_timeout=timeout)
+
+    def write(self, data):
+        self.port.write(data)
+
+    def read_until_prompt(self, timeout):
+        self.port.timeout = timeout
+        return self.port.read_until(PROMPT)
+
+    def close(self):
+        self.port.close()
+
+def open_link(address, timeout):
+    """Opens a link from a settings address: tcp://host:port, or a serial port with optional ,baud."""
+    match = re.match(r"^(?:tcp|socket)://([^:/]+):(\d+)", address)
+    if match:
+        return TcpLink(match.group(1), int(match.group(2)), timeout)
+    port, _, baud = address.partition(",")
+    return SerialLink(port, int(baud) if baud else DEFAULT_BAUDRATE, timeout)
+
+def decode_dtc_bytes(data):
+    """Decodes pairs of DTC bytes into codes such as "P0301", skipping zero padding."""
+    codes = []
+    for i in range(0, len(data) - 1, 2):
+        a, b = data[i], data[i + 1]
+        if a == 0 and b == 0:
+            continue
+        codes.append(f"{DTC_LETTERS[a >> 6]}{(a >> 4) & 0x3}{a & 0xF:X}{b:02X}")
+    return codes
+
+def decode_freeze_frame(name, payload):
+    """Decodes a Mode 02 reply (42 PID frame data...) for a FREEZE_<PID name> or FREEZE_DTC command."""
+    pid_name = name[len("FREEZE_"):]
+    pid = FREEZE_DTC_PID if pid_name == "DTC" else MODE01_PIDS[pid_name].pid
+    if len(payload) < 4 or payload[0] != 0x42 or payload[1] != pid:
+        return None
+    if pid == FREEZE_DTC_PID:
+        codes = decode_dtc_bytes(payload[3:5])
+        return codes[0] if codes else None
+    return decode(pid_name, payload[3:])
+
+class RawElm327:
+    """Talks AT/OBD directly to an ELM327 with echo, spaces and headers off.
+
+    Exposes the same is_connected/query/close interface as python-obd's OBD and the
+    simulator for the commands the app polls; values come back as plain floats.
+    """
+    def __init__(self, address, timeout=30, protocol=None, query_timeout=5.0):
+        self.query_timeout = query_timeout
+        self.tuner = ResponseCountTuner()
+        self._protocol_id = None
+        self._connected = False
+        self.link = open_link(address, timeout)
+        try:
+            self._initialize(protocol, timeout)
+        except Exception:
+            self.link.close()
+            raise
+
+    def _initialize(self, protocol, timeout):
+        self._command(b"ATZ", timeout=3.0)
+        for setting in (b"ATE0", b"ATL0", b"ATS0", b"ATH0"):
+            self._command(setting)
+        self.tuner.enabled = parse_elm_version(" ".join(self._command(b"ATI"))) >= MIN_ELM_VERSION
+
+        self._command(b"ATSP" + (protocol or "0").encode())
+        # The first request triggers the protocol search; give it the full connect timeout
+        if not self._hex_lines(self._command(b"0100", timeout=timeout)):
+            return
+        reply = self._command(b"ATDPN")
+        self._protocol_id = reply[0].lstrip("A") if reply else None
+        self._connected = True
+
+    def _command(self, request, timeout=None):
+        """Sends one request and returns the reply lines (prompt and blanks removed)."""
+        self.link.write(request + b"\r")
+        raw = self.link.read_until_prompt(timeout or self.query_timeout)
+        text = raw.replace(PROMPT, b"").decode("ascii", errors="replace")
+        return [line.strip() for line in re.split(r"[\r\n]+", text)
+                if line.strip() and line.strip() != "SEARCHING..."]
+
+    @staticmethod
+    def _hex_lines(lines):
+        return [line for line in lines if not line.startswith(ERROR_REPLIES)]
+
+    def _payloads(self, lines):
+        """Turns reply lines into one bytes payload per ECU message.
+
+        Multi-frame CAN replies arrive as a length line ("014") followed by numbered
+        frames ("0:4902...", "1:..."); everything else is one message per line.
+        """
+        lines = self._hex_lines(lines)
+        if len(lines) > 1 and len(lines[0]) == 3 and ":" in lines[1]:
+            length = int(lines[0], 16)
+            data = "".join(line.split(":", 1)[1] for line in lines[1:] if ":" in line)
+            return [bytes.fromhex(data)[:length]]
+        payloads = []
+        for line in lines:
+            try:
+                payloads.append(bytes.fromhex(line))
+            except ValueError:
+                continue  # garbled line
+        return payloads
+
+    def _frame_count(self, lines):
+        lines = self._hex_lines(lines)
+        return sum(1 for line in lines if ":" in line) or len(lines)
+
+    def _request(self, request, label):
+        """Sends an OBD request through the response-count fast path."""
+        to_send = self.tuner.build(request)
+        start = time.perf_counter()
+        lines = self._command(to_send)
+        latency = time.perf_counter() - start
+        self.tuner.observe(request, label, self._frame_count(lines), latency, fast=to_send != request)
+        atst = self.tuner.next_atst()
+        if atst is not None:
+            self._command(b"ATST%02X" % atst)
+        return lines
+
+    def is_connected(self):
+        return self._connected
+
+    def protocol_id(self):
+        return self._protocol_id
+
+    def query(self, cmd, force=False):
+        if not self._connected:
+            return RawResponse()
+        if cmd.name in MODE01_PIDS:
+            lines = self._request(request_bytes([cmd.name]), cmd.name)
+            for payload in self._payloads(lines):
+                if len(payload) > 2 and payload[0] == 0x41 and payload[1] == MODE01_PIDS[cmd.name].pid:
+                    return RawResponse(decode(cmd.name, payload[2:]), lines)
+            return RawResponse(None, lines)
+        if cmd.name == "GET_DTC":
+            return RawResponse(self._read_dtcs(), None)
+        if cmd.name.startswith("FREEZE_"):
+            lines = self._command(cmd.command)
+            for payload in self._payloads(lines):
+                value = decode_freeze_frame(cmd.name, payload)
+                if value is not None:
+                    return RawResponse(value, lines)
+            return RawResponse(None, lines)
+        return RawResponse()
+
+    def query_multi(self, names):
+        """Sends one multi-PID Mode 01 request; returns {name: value} or None if rejected."""
+        if not self._connected:
+            return None
+        for payload in self._payloads(self._request(request_bytes(names), "MULTI_" + "_".join(names))):
+            values = split_multi_pid_response(payload)
+            if values:
+                return values
+        return None
+
+    def supported_pids(self):
+        """Reads the 0100/0120/0140... bitmaps until one says no further range is supported."""
+        supported = set()
+        for base in range(0x00, 0x100, 0x20):
+            bitmap = None
+            for payload in self._payloads(self._command(b"01%02X" % base)):
+                if len(payload) >= 6 and payload[0] == 0x41 and payload[1] == base:
+                    bitmap = decode_supported_pids(base, payload[2:6])
+                    break
+            if not bitmap:
+                break
+            supported |= bitmap
+            if base + 0x20 not in bitmap:
+                break
+        return supported
+
+    def read_vin(self):
+        """Reads the VIN with Mode 09 PID 02; returns None if the ECU doesn't report one."""
+        data = b""
+        for payload in self._payloads(self._command(b"0902")):
+            # Each message is 49 02 <sequence number> followed by VIN characters
+            if len(payload) > 3 and payload[0] == 0x49 and payload[1] == 0x02:
+                data += payload[3:]
+        return decode_vin(data) if data else None
+
+    def _read_dtcs(self):
+        from dtc_index import DTC_CODES
+        codes = []
+        for payload in self._payloads(self._command(b"03")):
+            if not payload or payload[0] != 0x43:
+                continue
+            # CAN replies carry a DTC count byte after the mode byte
+            data = payload[2:] if self._protocol_id in CAN_PROTOCOL_IDS else payload[1:]
+            codes.extend(code for code in decode_dtc_bytes(data) if code not in codes)
+        return [(code, DTC_CODES.get(code, "")) for code in codes]
+
+    def latency_report(self):
+        return self.tuner.latency_report()
+
+    def close(self):
+        self._connected = False
+        try:
+            self.link.close()
+        except OSError:
+            pass
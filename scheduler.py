@@ -0,0 +1,76 @@
+# scheduler.py
+import time
+
+# Target polling rates in Hz for every live-data channel. Fast-moving values
+# (RPM, speed) get most of the link, slow ones (temperatures, voltage) only
+# need a refresh every second or so.
+DEFAULT_POLL_RATES = {
+    'rpm': 20.0,
+    'speed': 20.0,
+    'load': 10.0,
+    'temp': 1.0,
+    'Intake Pressure (kPa)': 5.0,
+    'Intake Temp (°C)': 1.0,
+    'Battery Voltage (V)': 1.0,
+    'dtc': 1.0 / 15,  # stored-DTC check that triggers freeze-frame captures
+}
+
+class PollScheduler:
+    """Deadline-based scheduler that always hands out the most overdue channel first."""
+    def __init__(self, rates=None, clock=time.monotonic):
+        rates = DEFAULT_POLL_RATES if rates is None else rates
+        self.clock = clock
+        now = clock()
+        self.started = now
+        self.periods = {name: 1.0 / hz for name, hz in rates.items() if hz > 0}
+        # Every channel starts due immediately so the first cycle fills all values
+        self.deadlines = {name: now for name in self.periods}
+        self.polls = {name: 0 for name in self.periods}
+        self.last_lag = {name: 0.0 for name in self.periods}
+        self.max_lag = {name: 0.0 for name in self.periods}
+
+    def due(self, now=None, limit=None):
+        """Returns the channels whose deadline has passed, most overdue first."""
+        now = self.clock() if now is None else now
+        overdue = [name for name, deadline in self.deadlines.items() if deadline <= now]
+        overdue.sort(key=self.deadlines.__getitem__)
+        return overdue if limit is None else overdue[:limit]
+
+    def time_until_next(self, now=None):
+        """Seconds until the next channel becomes due (0 if one already is)."""
+        now = self.clock() if now is None else now
+        return max(0.0, min(self.deadlines.values()) - now) if self.deadlines else 0.0
+
+    def mark_polled(self, name, now=None):
+        """Records that a channel was serviced and schedules its next deadline."""
+        now = self.clock() if now is None else now
+        deadline = self.deadlines[name]
+        lag = max(0.0, now - deadline)
+        self.last_lag[name] = lag
+        self.max_lag[name] = max(self.max_lag[name], lag)
+        self.polls[name] += 1
+
+        next_deadline = deadline + self.periods[name]
+        # If the link can't keep up, drop the missed slots instead of bursting to catch up
+        self.deadlines[name] = next_deadline if next_deadline > now else now
+
+    def report(self, now=None):
+        """Per-channel target rate, achieved rate and lag (in milliseconds)."""
+        now = self.clock() if now is None else now
+        elapsed = max(now - self.started, 1e-9)
+        return {
+            name: {
+                'target_hz': 1.0 / period,
+                'achieved_hz': self.polls[name] / elapsed,
+                'lag_ms': self.last_lag[name] * 1000.0,
+                'max_lag_ms': self.max_lag[name] * 1000.0,
+            }
+            for name, period in self.periods.items()
+        }
+
+    def worst_lag(self):
+        """Returns (channel, lag in ms) for the channel that is furthest behind."""
+        if not self.last_lag:
+            return None, 0.0
+        name = max(self.last_lag, key=self.last_lag.__getitem__)
+        return name, self.last_lag[name] * 1000.0
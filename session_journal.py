@@ -0,0 +1,164 @@
+# session_journal.py
+"""Write-ahead journal for the live-data recording, so a crash or power loss costs little.
+
+Every sample is appended to the session's journal (recordings/*.wal) as a small
+CRC-checked frame and handed to the OS at once, so an app crash loses nothing.
+How often the journal is fsynced, which bounds what a power loss can take, is set
+by the policy (`journal_fsync` in settings.ini):
+
+  always        fsync after every sample
+  bytes:N       fsync once N bytes are unsynced
+  interval:S    fsync on the first write at least S seconds after the last fsync
+  none          never fsync; the OS writes back on its own schedule
+
+A session that ends normally deletes its journal. One left behind is replayed into
+the session's column recording by recover_journals() at the next start.
+"""
+import glob
+import json
+import os
+import struct
+import time
+import zlib
+from column_recorder import ColumnRecorder
+from session_recorder import RECORDINGS_DIR
+
+JOURNAL_SUFFIX = ".wal"
+DEFAULT_POLICY = "interval:1"
+# kind, payload length | payload | crc32 of kind and payload
+FRAME = struct.Struct("<BH")
+CRC = struct.Struct("<I")
+HEADER, SAMPLE = 1, 2
+# channel number, monotonic time, value
+SAMPLE_PAYLOAD = struct.Struct("<Hdf")
+SAMPLE_FRAME_SIZE = FRAME.size + SAMPLE_PAYLOAD.size + CRC.size
+
+def parse_policy(text):
+    """Parses a policy string into (kind, limit): ('always', 0), ('bytes', N), ('interval', S) or ('none', 0)."""
+    kind, _, limit = (text or DEFAULT_POLICY).strip().lower().partition(":")
+    try:
+        if kind == "bytes":
+            return kind, max(1, int(limit))
+        if kind == "interval":
+            return kind, max(0.0, float(limit))
+    except ValueError:
+        pass
+    else:
+        if kind in ("always", "none"):
+            return kind, 0
+    print(f"Unknown journal_fsync policy '{text}', using '{DEFAULT_POLICY}'.")
+    return parse_policy(DEFAULT_POLICY)
+
+def _frame(kind, payload):
+    return FRAME.pack(kind, len(payload)) + payload + CRC.pack(zlib.crc32(payload, kind))
+
+class SampleJournal:
+    """Sample sink appending every sample to a journal file, fsynced according to the policy.
+
+    Tracks the worst loss window it allowed: the most bytes and the longest time
+    that were written but not yet fsynced.
+    """
+    def __init__(self, path, header, policy=DEFAULT_POLICY, clock=time.monotonic):
+        self.path = path
+        self.ids = {name: i for i, name in enumerate(header['channels'])}
+        self.policy, self.limit = parse_policy(policy) if isinstance(policy, str) else policy
+        self.clock = clock
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+        self.samples = 0
+        self.syncs = 0
+        self.unsynced_bytes = 0
+        self.max_unsynced_bytes = 0
+        self.max_unsynced_seconds = 0.0
+        self._oldest_unsynced = None
+        self._last_sync = clock()
+        os.write(self._fd, _frame(HEADER, json.dumps(header).encode('utf-8')))
+        self.sync()
+
+    def on_sample(self, channel, t, value):
+        i = self.ids.get(channel)
+        if i is None:
+            return
+        os.write(self._fd, _frame(SAMPLE, SAMPLE_PAYLOAD.pack(i, t, value)))
+        self.samples += 1
+        if self._oldest_unsynced is None:
+            self._oldest_unsynced = self.clock()
+        self.unsynced_bytes += SAMPLE_FRAME_SIZE
+        policy = self.policy
+        if (policy == "always"
+                or (policy == "bytes" and self.unsynced_bytes >= self.limit)
+                or (policy == "interval" and self.clock() - self._last_sync >= self.limit)):
+            self.sync()
+
+    def sync(self):
+        os.fsync(self._fd)
+        now = self.clock()
+        if self._oldest_unsynced is not None:
+            self.max_unsynced_seconds = max(self.max_unsynced_seconds, now - self._oldest_unsynced)
+        self.max_unsynced_bytes = max(self.max_unsynced_bytes, self.unsynced_bytes)
+        self.unsynced_bytes = 0
+        self._oldest_unsynced = None
+        self._last_sync = now
+        self.syncs += 1
+
+    def close(self):
+        if self._fd is not None:
+            self.sync()
+            os.close(self._fd)
+            self._fd = None
+
+    def discard(self):
+        """Closes and deletes the journal once its samples are safely in the session file."""
+        self.close()
+        os.remove(self.path)
+
+def read_journal(path):
+    """Yields (kind, payload) for every intact frame, stopping at a torn or corrupt one."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        kind, length = FRAME.unpack_from(data, offset)
+        end = offset + FRAME.size + length
+        if end + CRC.size > len(data):
+            return
+        payload = data[offset + FRAME.size:end]
+        if CRC.unpack_from(data, end)[0] != zlib.crc32(payload, kind):
+            return
+        yield kind, payload
+        offset = end + CRC.size
+
+def recover_journal(path):
+    """Rebuilds a session's column recording from its journal, then deletes the journal.
+
+    Returns (recording path, samples recovered).
+    """
+    frames = read_journal(path)
+    kind, payload = next(frames, (None, None))
+    if kind != HEADER:
+        raise ValueError(f"{path} has no journal header.")
+    header = json.loads(payload)
+    metadata = {key: value for key, value in header.items() if key not in ('channels', 'recording')}
+    started = header.get('started_monotonic', 0.0)
+    recorder = ColumnRecorder(header['recording'], header['channels'], clock=lambda: started,
+                              **metadata, recovered=True)
+    channels = header['channels']
+    for kind, payload in frames:
+        if kind == SAMPLE:
+            i, t, value = SAMPLE_PAYLOAD.unpack(payload)
+            recorder.on_sample(channels[i], t, value)
+    recorder.close()
+    os.remove(path)
+    return recorder.path, recorder.samples
+
+def recover_journals(directory=RECORDINGS_DIR):
+    """Recovers every journal left behind by a session that didn't end normally.
+
+    Returns [(recording path, samples recovered)].
+    """
+    recovered = []
+    for path in sorted(glob.glob(os.path.join(directory, "*" + JOURNAL_SUFFIX))):
+        try:
+            recovered.append(recover_journal(path))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not recover {path}: {e}")
+    return recovered
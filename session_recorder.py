@@ -0,0 +1,257 @@
+# session_recorder.py
+"""Records live sessions as JSONL request/response traffic and replays them.
+
+A recording starts with a header line ({"type": "session", ...}) followed by one
+line per request: the command, the raw request bytes, the raw reply lines as the
+transport saw them, the decoded value and the latency. Files ending in .gz are
+compressed. ReplayConnection streams a recording back through the normal pipeline.
+"""
+import glob
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from obd_pids import MODE01_PIDS, request_bytes, split_multi_pid_response
+
+RECORDINGS_DIR = 'recordings'
+FORMAT_VERSION = 1
+# Recordings of each kind kept in RECORDINGS_DIR; older ones are deleted as new sessions start
+DEFAULT_KEEP = 20
+
+def json_value(value):
+    """JSON-friendly form of a response value (pint quantities lose their unit)."""
+    value = getattr(value, 'magnitude', value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('ascii', errors='replace')
+    if isinstance(value, (list, tuple)):
+        return [json_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: json_value(v) for k, v in value.items()}
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    return str(value)
+
+def raw_lines(response):
+    """The reply lines behind a response, for any of the transports."""
+    if getattr(response, 'lines', None):
+        return list(response.lines)  # RawElm327
+    messages = getattr(response, 'messages', None)
+    if messages:
+        return [line for message in messages for line in message.raw().splitlines()]  # python-obd
+    return []
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def prune_recordings(directory=RECORDINGS_DIR, suffix=".jsonl", keep=DEFAULT_KEEP):
+    """Deletes the oldest session-*<suffix> files so at most `keep` remain. Returns the deleted paths."""
+    # The names carry the start time, so they sort oldest first
+    paths = sorted(glob.glob(os.path.join(directory, "session-*" + suffix)))
+    stale = paths[:max(0, len(paths) - keep)]
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Could not delete old recording {path}: {e}")
+    return stale
+
+def new_recording_path(directory=RECORDINGS_DIR, suffix=".jsonl", keep=None):
+    """Path for a new recording. With `keep`, older recordings of the same kind are pruned to make room."""
+    os.makedirs(directory, exist_ok=True)
+    if keep:
+        prune_recordings(directory, suffix, keep - 1)
+    return os.path.join(directory, datetime.now().strftime("session-%Y%m%d-%H%M%S") + suffix)
+
+class RecordingConnection:
+    """Wraps a connection and writes every request/response pair to a recording.
+
+    Anything it doesn't intercept (protocol_id, latency_report, ...) goes to the
+    wrapped connection, so it can stand in for it anywhere.
+    """
+    def __init__(self, connection, path, **header):
+        self.connection = connection
+        self.path = path
+        self._file = _open(path, 'w')
+        self._start = time.monotonic()
+        protocol_id = getattr(connection, 'protocol_id', None)
+        self._write({'type': 'session', 'version': FORMAT_VERSION, 'started': time.time(),
+                     'transport': type(connection).__name__,
+                     'protocol': protocol_id() if protocol_id else None, **header})
+        if hasattr(connection, 'query_multi'):
+            self.query_multi = self._query_multi
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':')) + "\n")
+
+    def query(self, cmd, *args, **kwargs):
+        start = time.monotonic()
+        response = self.connection.query(cmd, *args, **kwargs)
+        end = time.monotonic()
+        command = getattr(cmd, 'command', None)
+        self._write({
+            't': round(start - self._start, 4), 'cmd': cmd.name,
+            'req': command.decode('ascii', errors='replace') if isinstance(command, bytes) else None,
+            'raw': raw_lines(response),
+            'value': None if response.is_null() else json_value(response.value),
+            'latency': round(end - start, 4),
+        })
+        return response
+
+    def _query_multi(self, names):
+        start = time.monotonic()
+        values = self.connection.query_multi(names)
+        end = time.monotonic()
+        self._write({
+            't': round(start - self._start, 4), 'cmd': "MULTI_" + "_".join(names),
+            'req': request_bytes(names).decode('ascii'), 'raw': [],
+            'value': values, 'latency': round(end - start, 4),
+        })
+        return values
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            self.connection.close()
+
+def payload_from_raw(line):
+    """The OBD payload of one raw reply line, with any CAN header and PCI byte removed."""
+    line = line.replace(" ", "")
+    if ":" in line:
+        return None  # part of a multi-frame reply
+    try:
+        if len(line) % 2:
+            return bytes.fromhex(line[5:])  # 11-bit header ("7E8") plus PCI byte
+        data = bytes.fromhex(line)
+    except ValueError:
+        return None  # garbled
+    if len(data) > 5 and data[0] == 0x18 and data[1] in (0xDA, 0xDB):
+        return data[5:]  # 29-bit header plus PCI byte
+    return data
+
+def decode_raw(name, lines):
+    """Re-decodes a recorded Mode 01 reply with our own decoders; None if it can't."""
+    for line in lines:
+        payload = payload_from_raw(line)
+        if payload:
+            value = split_multi_pid_response(payload).get(name)
+            if value is not None:
+                return value
+    return None
+
+class ReplayResponse:
+    """Response object for replayed values, like the simulator's MockResponse."""
+    def __init__(self, value=None, lines=None):
+        self.value = value
+        self.lines = lines or []
+    def is_null(self):
+        return self.value is None
+
+class ReplayConnection:
+    """Plays a recording back with the is_connected/query/close interface of the simulator.
+
+    The session pulls the recorded requests in order (`peek`, `take`) and polls each
+    one at its recorded time on the replay clock: `speed` 1 replays in real time, N
+    replays N times faster (latencies shrink too), and 0 replays as fast as possible.
+    A query is answered with the latest taken record for its command. The file is
+    streamed, so only that record per command is held in memory. Mode 01 values are
+    decoded again from the raw reply lines, so the decoders run against the recorded
+    traffic.
+    """
+    def __init__(self, path, speed=1.0, decode=True, sleep=time.sleep):
+        self.path = path
+        self.speed = speed
+        self.decode = decode
+        self.sleep = sleep
+        self._file = _open(path, 'r')
+        first = self._file.readline()
+        self.header = json.loads(first) if first.strip() else {}
+        if self.header.get('type') != 'session':
+            self._file.close()
+            raise ValueError(f"{path} is not a session recording.")
+        self._latest = {}
+        self._pending = None
+        self._start = time.monotonic()
+        self._now = 0.0
+        self._finished = False
+        self.replayed = 0
+
+    def is_connected(self):
+        return not self._finished
+
+    def protocol_id(self):
+        return self.header.get('protocol')
+
+    def recorded_supported_pids(self):
+        pids = self.header.get('supported_pids')
+        return set(pids) if pids else None
+
+    def clock(self):
+        """Replay time: seconds into the recording."""
+        if not self.speed:
+            return self._now  # the time of the last request taken
+        return (time.monotonic() - self._start) * self.speed
+
+    def time_until(self, t):
+        """Wall-clock seconds until replay time t (never any when replaying as fast as possible)."""
+        if not self.speed:
+            return 0.0
+        return max(0.0, t / self.speed - (time.monotonic() - self._start))
+
+    def peek(self):
+        """The next recorded request without taking it, or None at the end of the recording."""
+        if self._pending is None and not self._finished:
+            line = self._file.readline()
+            if line:
+                self._pending = json.loads(line)
+            else:
+                self._finished = True
+        return self._pending
+
+    def take(self):
+        """Takes the next recorded request: it now answers queries for its command."""
+        record = self.peek()
+        if record is not None:
+            self._pending = None
+            self._latest[record['cmd']] = record
+            self._now = max(self._now, record['t'])
+        return record
+
+    def _answer(self, name):
+        record = self.peek()
+        if record is not None and record['cmd'] == name:
+            # Requests the session doesn't schedule itself (e.g. Mode 02 reads) follow the recording
+            self.take()
+        record = self._latest.get(name)
+        if record is None:
+            return None
+        self.replayed += 1
+        if self.speed and record.get('latency'):
+            self.sleep(record['latency'] / self.speed)
+        return record
+
+    def query(self, cmd, force=False):
+        record = self._answer(cmd.name)
+        if record is None:
+            return ReplayResponse()
+        value = record['value']
+        if self.decode and cmd.name in MODE01_PIDS and record['raw']:
+            decoded = decode_raw(cmd.name, record['raw'])
+            value = decoded if decoded is not None else value
+        elif cmd.name == "GET_DTC" and value:
+            value = [tuple(dtc) for dtc in value]
+        return ReplayResponse(value, record['raw'])
+
+    def query_multi(self, names):
+        record = self._answer("MULTI_" + "_".join(names))
+        return record['value'] if record else None
+
+    def close(self):
+        self._finished = True
+        self._file.close()
@@ -1,7 +1,9 @@
 # simulator.py
+import asyncio
 import time
-import random
-from dtc_database import DTC_CODES
+from dtc_index import DTC_CODES
+from vehicle_model import VehicleModel, np
+from link_profiles import SimulatedLink, OK
 
 class MockResponse:
     """A simple class to mimic the response object from python-obd."""
@@ -10,42 +12,130 @@ class MockResponse:
     def is_null(self):
         return self.value is None
 
+# Live data PIDs, read from the vehicle model at the resolution the ECU would report
+PID_VALUES = {
+    "RPM": lambda s: round(s['rpm'] * 4) / 4,
+    "SPEED": lambda s: round(s['speed']),
+    "COOLANT_TEMP": lambda s: round(s['coolant']),
+    "ENGINE_LOAD": lambda s: round(round(s['load'] * 2.55) / 2.55, 1),
+    "INTAKE_PRESSURE": lambda s: round(s['map']),
+    "INTAKE_TEMP": lambda s: round(s['intake']),
+    "CONTROL_MODULE_VOLTAGE": lambda s: round(s['voltage'], 1),
+}
+
+# The same quantization over NumPy arrays, for generate()
+PID_ARRAYS = {
+    "RPM": lambda s: np.round(s['rpm'] * 4) / 4,
+    "SPEED": lambda s: np.round(s['speed']),
+    "COOLANT_TEMP": lambda s: np.round(s['coolant']),
+    "ENGINE_LOAD": lambda s: np.round(np.round(s['load'] * 2.55) / 2.55, 1),
+    "INTAKE_PRESSURE": lambda s: np.round(s['map']),
+    "INTAKE_TEMP": lambda s: np.round(s['intake']),
+    "CONTROL_MODULE_VOLTAGE": lambda s: np.round(s['voltage'], 1),
+}
+
+_dtc_keys = None
+
+def dtc_keys():
+    """All DTC codes as a tuple, built once on first use (the index itself is loaded lazily)."""
+    global _dtc_keys
+    if _dtc_keys is None:
+        _dtc_keys = tuple(DTC_CODES)
+    return _dtc_keys
+
 class OBDSimulator:
-    """A simulator class that uses the new, imported DTC database."""
-    def __init__(self, *args, **kwargs):
+    """A simulator class that uses the new, imported DTC database.
+
+    Live data comes from a seeded VehicleModel, so values are coherent over time
+    and a given seed replays the same ride. Every request goes through a simulated
+    adapter link (see link_profiles.py), which adds latency and failures.
+
+    Connecting takes the link profile's connect time (none for 'ideal') unless
+    `connect_delay` overrides it. Pass autoconnect=False and await `connect_async()`
+    to open many simulated connections concurrently.
+    """
+    def __init__(self, *args, seed=None, clock=None, connect_delay=None, link_profile='ideal', sleep=time.sleep,
+                 autoconnect=True, **kwargs):
         self._is_connected = False
-        time.sleep(1.5) 
+        self.model = VehicleModel(seed=seed, clock=clock)
+        self.link = SimulatedLink(link_profile, seed=None if seed is None else f"{seed}:link", sleep=sleep)
+        self.connect_delay = self.link.connect_delay() if connect_delay is None else connect_delay
+        self.connect_time = None
+        # command name -> handler returning the response value (None for NO DATA)
+        self._handlers = {name: self._pid_handler(value) for name, value in PID_VALUES.items()}
+        self._handlers["GET_DTC"] = self._stored_dtcs
+        # Mode 02: the ECU's snapshot from when the first stored DTC was set
+        self.freeze_frame = None  # (code, model state) once a DTC is stored
+        self._handlers.update({"FREEZE_" + name: self._freeze_handler(value) for name, value in PID_VALUES.items()})
+        self._handlers["FREEZE_DTC"] = lambda: self.freeze_frame[0] if self.freeze_frame else None
+        if autoconnect:
+            self.connect()
+
+    def connect(self):
+        start = time.perf_counter()
+        if self.connect_delay:
+            self.link.sleep(self.connect_delay)
+        self.connect_time = time.perf_counter() - start
+        self._is_connected = True
+
+    async def connect_async(self):
+        start = time.perf_counter()
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        self.connect_time = time.perf_counter() - start
         self._is_connected = True
+        return self
+
+    def _pid_handler(self, value):
+        sample = self.model.sample
+        return lambda: value(sample())
+
+    def _freeze_handler(self, value):
+        return lambda: value(self.freeze_frame[1]) if self.freeze_frame else None
+
+    def _stored_dtcs(self):
+        rng = self.model.dtc_rng
+        keys = dtc_keys()
+        if keys and rng.random() < 0.25:
+            dtcs = [(key, DTC_CODES[key]) for key in rng.sample(keys, k=rng.randint(1, 2))]
+            if self.freeze_frame is None:
+                self.freeze_frame = (dtcs[0][0], dict(self.model.sample()))
+            return dtcs
+        return []
 
-    # --- FIX: These methods are now correctly indented to be part of the class ---
     def is_connected(self):
         return self._is_connected
 
-    def query(self, command):
-        if command.name == "RPM":
-            return MockResponse(random.randint(850, 4500))
-        elif command.name == "SPEED":
-            return MockResponse(random.randint(0, 110))
-        elif command.name == "COOLANT_TEMP":
-            return MockResponse(random.randint(40, 95))
-        elif command.name == "ENGINE_LOAD":
-            return MockResponse(round(random.uniform(20.0, 85.0), 1))
-        elif command.name == "INTAKE_PRESSURE":
-            return MockResponse(random.randint(15, 100))
-        elif command.name == "INTAKE_TEMP":
-            return MockResponse(random.randint(20, 50))
-        elif command.name == "CONTROL_MODULE_VOLTAGE":
-            return MockResponse(round(random.uniform(12.0, 14.5), 1))
-        elif command.name == "GET_DTC":
-            if DTC_CODES and random.random() < 0.25:
-                num_errors = random.randint(1, 2)
-                random_keys = random.sample(list(DTC_CODES.keys()), k=num_errors)
-                simulated_errors = [(key, DTC_CODES[key]) for key in random_keys]
-                return MockResponse(simulated_errors)
-            else:
-                return MockResponse([])
-        else:
+    def query(self, command, force=False):
+        if self.link.transfer() != OK:
+            # NO DATA, a timeout or an unparseable frame all reach the caller as a null response
             return MockResponse(None)
+        handler = self._handlers.get(command.name)
+        return MockResponse(handler() if handler is not None else None)
+
+    def generate(self, n, names=None, interval=0.05, start=0.0):
+        """Returns {'t': times, name: values} for n samples, `interval` seconds apart, as NumPy arrays.
+
+        One vectorized evaluation of the vehicle model, without the link or the clock,
+        for building large synthetic datasets. Requires NumPy.
+        """
+        if np is None:
+            raise RuntimeError("OBDSimulator.generate requires NumPy (pip install numpy).")
+        names = list(PID_ARRAYS) if names is None else names
+        state = self.model.evaluate_batch(start + interval * np.arange(n))
+        columns = {'t': state['t']}
+        for name in names:
+            columns[name] = PID_ARRAYS[name](state)
+        return columns
+
+    def link_report(self):
+        return self.link.report()
+
+    @classmethod
+    async def open_fleet(cls, count, seed=None, **kwargs):
+        """Connects `count` simulators concurrently (seeds seed, seed+1, ...); returns them in order."""
+        sims = [cls(seed=None if seed is None else seed + i, autoconnect=False, **kwargs) for i in range(count)]
+        return await asyncio.gather(*(sim.connect_async() for sim in sims))
 
     def close(self):
-        self._is_connected = False
\ No newline at end of file
+        self._is_connected = False
@@ -0,0 +1,29 @@
+# test_async_engine.py
+"""Regression tests for the asyncio diagnostics engine. Run with: py -m pytest test_async_engine.py"""
+import threading
+import time
+import async_engine
+
+class StubConnection:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+def test_stop_during_connect_closes_the_connection(monkeypatch):
+    connection = StubConnection()
+
+    def slow_connect(config):
+        time.sleep(1.0)
+        return connection, None, None
+
+    monkeypatch.setattr(async_engine, 'connect_session', slow_connect)
+    callbacks = {name: (lambda *args: None) for name in ('status', 'output', 'error', 'reset_buttons')}
+    stop_event = threading.Event()
+    threading.Timer(0.1, stop_event.set).start()
+    start = time.perf_counter()
+    async_engine.run_engine_thread({'brand': 'Test', 'connection_mode': 'Simulator'}, callbacks, stop_event)
+    # Stop returns at once; the connect finishes afterwards and its connection is closed
+    assert time.perf_counter() - start < 0.9
+    assert connection.closed.wait(3.0)
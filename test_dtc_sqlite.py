@@ -0,0 +1,22 @@
+# test_dtc_sqlite.py
+"""Regression tests for the SQLite DTC store. Run with: py -m pytest test_dtc_sqlite.py"""
+import pytest
+from dtc_sqlite import DtcSqliteStore, fts5_available
+
+pytestmark = pytest.mark.skipif(not fts5_available(), reason="SQLite built without FTS5")
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    store = DtcSqliteStore(str(tmp_path_factory.mktemp("dtc") / "dtc_codes.sqlite"))
+    yield store
+    store.close()
+
+@pytest.mark.parametrize("text", ["bad", "cab", "P4", "PC"])
+def test_search_words_and_partial_codes_fall_through_to_full_text(store, text):
+    # These match dtc_search.CODE_PREFIX but aren't J2012 prefixes; they used to raise ValueError
+    assert store.code_prefix(text) == []
+    assert isinstance(store.search(text), list)
+
+def test_search_code_prefix_lists_range_first(store):
+    results = store.search("P030")
+    assert results and all(code.startswith("P030") for code, _ in results[:10])
@@ -0,0 +1,83 @@
+# ui_queue.py
+import threading
+import traceback
+from collections import deque
+
+DEFAULT_FPS = 30
+# Ordered events (log lines etc.) kept while the GUI is busy; older ones are dropped past this
+MAX_PENDING_EVENTS = 1000
+# Events that must never be dropped, however far behind the GUI is
+ESSENTIAL_EVENTS = {'error', 'reset_buttons', 'display_dtcs'}
+
+class UiMailbox:
+    """Hands updates from the diagnostics thread to the Tk thread.
+
+    Channels in `latest_wins` (gauges, secondary panel, status) keep only their newest
+    value until the next drain. Everything else is delivered in order. The worker
+    only ever takes a lock and stores a value; all Tk calls happen in `drain`.
+    """
+    def __init__(self, handlers, latest_wins, max_events=MAX_PENDING_EVENTS):
+        self.handlers = handlers
+        self.latest_wins = set(latest_wins)
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._events = deque()
+        self.posted = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def post(self, channel, value):
+        """Stores the newest value for a latest-wins channel."""
+        with self._lock:
+            self.posted += 1
+            if channel in self._latest:
+                self.coalesced += 1
+            self._latest[channel] = value
+
+    def send(self, name, *args):
+        """Queues an ordered event."""
+        with self._lock:
+            self.posted += 1
+            if len(self._events) >= self.max_events:
+                self._drop_oldest()
+            self._events.append((name, args))
+
+    def _drop_oldest(self):
+        for i, (name, _) in enumerate(self._events):
+            if name not in ESSENTIAL_EVENTS:
+                del self._events[i]
+                self.dropped += 1
+                return
+
+    def callbacks(self):
+        """A callbacks dict for the diagnostics thread that writes into this mailbox."""
+        return {
+            name: (lambda value, name=name: self.post(name, value)) if name in self.latest_wins
+            else (lambda *args, name=name: self.send(name, *args))
+            for name in self.handlers
+        }
+
+    def drain(self):
+        """Delivers everything pending. Must be called on the Tk thread.
+
+        A handler that raises is reported and skipped; the rest are still delivered.
+        """
+        with self._lock:
+            events, self._events = self._events, deque()
+            latest, self._latest = self._latest, {}
+        for name, args in events:
+            self._deliver(name, args)
+        for name, value in latest.items():
+            self._deliver(name, (value,))
+
+    def _deliver(self, name, args):
+        try:
+            self.handlers[name](*args)
+        except Exception:
+            print(f"UI update '{name}' failed:")
+            traceback.print_exc()
+
+    def stats(self):
+        with self._lock:
+            return {'posted': self.posted, 'coalesced': self.coalesced, 'dropped': self.dropped}
@@ -0,0 +1,61 @@
+# vehicle_cache.py
+import json
+import os
+import time
+
+CACHE_FILE = 'vehicle_cache.json'
+
+def vehicle_key(vin, address):
+    """Cache key for a vehicle. Bikes that don't report a VIN are keyed by adapter address."""
+    return vin if vin else f"address:{address}"
+
+class VehicleCache:
+    """Remembers the protocol and supported Mode 01 PIDs of every vehicle we've connected to.
+
+    File layout: {"vehicles": {key: {...}}, "addresses": {address: key of the last vehicle seen}}
+    """
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.data = {'vehicles': {}, 'addresses': {}}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+        except (OSError, ValueError):
+            pass  # No cache yet (or unreadable): every vehicle gets a full detect
+
+    def protocol_hint(self, address):
+        """Protocol of the last vehicle seen on this adapter, to skip the auto-detect."""
+        entry = self.data['vehicles'].get(self.data['addresses'].get(address))
+        return entry['protocol'] if entry else None
+
+    def lookup(self, vin, address, protocol):
+        """Returns the cached supported PID set, or None if unknown or the protocol changed."""
+        entry = self.data['vehicles'].get(vehicle_key(vin, address))
+        if not entry or entry['protocol'] != protocol:
+            return None
+        self.data['addresses'][address] = vehicle_key(vin, address)
+        self.save()
+        return set(entry['supported_pids'])
+
+    def store(self, vin, address, protocol, supported_pids):
+        key = vehicle_key(vin, address)
+        self.data['vehicles'][key] = {
+            'vin': vin,
+            'protocol': protocol,
+            'supported_pids': sorted(supported_pids),
+            'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.data['addresses'][address] = key
+        self.save()
+
+    def forget_address(self, address):
+        """Drops the protocol hint for an adapter, e.g. after the hinted protocol failed."""
+        if self.data['addresses'].pop(address, None) is not None:
+            self.save()
+
+    def save(self):
+        # Write to a temp file first so a crash can't leave a half-written cache
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
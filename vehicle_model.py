@@ -0,0 +1,204 @@
+# vehicle_model.py
+"""A small, seeded motorcycle model for the simulator.
+
+Speed follows a seeded drive cycle of keyframes (idle, pull away, cruise, slow down);
+everything else is derived from it: throttle from acceleration and drag, gear and RPM
+from the gear ratios, load and manifold pressure from throttle and RPM. Coolant,
+intake air and battery follow closed-form warm-up/charging curves, so any instant
+can be evaluated directly without stepping through the ones before it.
+"""
+import math
+import random
+import time
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # only needed for evaluate_batch
+    np = None
+
+# Overall ratio per gear (primary x gearbox x final drive) and the rear wheel
+GEAR_RATIOS = (0.0, 12.5, 8.9, 7.0, 5.9, 5.2, 4.7)
+WHEEL_CIRCUMFERENCE_M = 1.95
+IDLE_RPM = 1200
+REDLINE_RPM = 9500
+
+AMBIENT_C = 22.0
+THERMOSTAT_C = 88.0
+WARMUP_TAU_S = 240.0  # coolant reaches ~63% of the way to the thermostat in this time
+BATTERY_REST_V = 12.5
+REGULATOR_V = 14.2
+CHARGE_TAU_S = 90.0
+
+# Samples are quantized to this step, so queries for several PIDs in the same
+# instant share one evaluation (and repeated runs with a seed are identical)
+TICK_S = 0.01
+NOISE_TABLE_SIZE = 4096
+CYCLE_SEGMENTS = 48
+
+def build_drive_cycle(rng, segments=CYCLE_SEGMENTS):
+    """Returns ([times], [speeds in km/h]): keyframes of a looping drive cycle."""
+    times, speeds = [0.0], [0.0]
+
+    def to(speed, duration):
+        times.append(times[-1] + duration)
+        speeds.append(speed)
+
+    for _ in range(segments):
+        to(0.0, rng.uniform(3, 15))  # idle at a light
+        speed = 0.0
+        for _ in range(rng.randint(1, 3)):
+            target = rng.choice((30, 40, 50, 60, 80, 100, 120)) + rng.uniform(-5, 5)
+            accel = rng.uniform(1.5, 3.5) if target > speed else rng.uniform(1.0, 2.5)  # m/s^2
+            to(target, abs(target - speed) / 3.6 / accel)
+            speed = target
+            to(speed + rng.uniform(-3, 3), rng.uniform(8, 60))  # cruise, drifting a little
+            speed = speeds[-1]
+        to(0.0, speed / 3.6 / rng.uniform(2.0, 4.0))  # brake to a stop
+    return times, speeds
+
+class VehicleModel:
+    """Seeded engine and chassis model, evaluated on simulated time.
+
+    By default simulated time follows the wall clock from creation; pass `clock`
+    (any callable returning seconds) or call `advance` to drive it yourself.
+    """
+    def __init__(self, seed=None, clock=None):
+        self.seed = seed
+        rng = random.Random(seed)
+        self.times, self.speeds = build_drive_cycle(rng)
+        self.period = self.times[-1]
+        self.noise = [rng.gauss(0.0, 1.0) for _ in range(NOISE_TABLE_SIZE)]
+        self.dtc_rng = random.Random(rng.random())
+        if clock is None:
+            start = time.monotonic()
+            clock = lambda: time.monotonic() - start
+        self.clock = clock
+        self._offset = 0.0
+        self._tick = None
+        self.state = None
+
+    def advance(self, seconds):
+        """Moves simulated time forward without waiting."""
+        self._offset += seconds
+
+    def now(self):
+        return self.clock() + self._offset
+
+    def _noise(self, tick, channel, scale):
+        return self.noise[(tick * 7 + channel * 613) % NOISE_TABLE_SIZE] * scale
+
+    def sample(self, t=None):
+        """Returns the state dict at simulated time t (now by default)."""
+        tick = int((self.now() if t is None else t) / TICK_S)
+        if tick != self._tick:
+            self.state = self._evaluate(tick)
+            self._tick = tick
+        return self.state
+
+    def _evaluate(self, tick):
+        t = tick * TICK_S
+        # Speed and acceleration from the keyframes
+        c = t % self.period
+        i = bisect_right(self.times, c) - 1
+        t0, t1 = self.times[i], self.times[i + 1]
+        v0, v1 = self.speeds[i], self.speeds[i + 1]
+        slope = (v1 - v0) / (t1 - t0)  # km/h per second
+        speed = max(0.0, v0 + slope * (c - t0))
+        accel = slope / 3.6
+
+        # Throttle: what it takes to accelerate plus hold speed against drag
+        if accel < -0.2:
+            throttle = 0.0
+        else:
+            throttle = min(1.0, 0.06 + 0.22 * max(accel, 0.0) + 0.000035 * speed * speed)
+
+        # Gear: the tallest one that keeps RPM above the shift-down point, shifting later under load
+        wheel_rpm = speed / 3.6 / WHEEL_CIRCUMFERENCE_M * 60.0
+        if speed < 8.0:
+            gear = 1 if accel > 0 else 0
+        else:
+            upshift = 3500 + 4500 * throttle
+            gear = 1
+            while gear < len(GEAR_RATIOS) - 1 and wheel_rpm * GEAR_RATIOS[gear] > upshift:
+                gear += 1
+        if gear == 0:
+            rpm = IDLE_RPM
+        else:
+            # Below the clutch's engagement speed it slips, holding the engine above idle
+            rpm = max(wheel_rpm * GEAR_RATIOS[gear], IDLE_RPM + 2500 * throttle)
+        rpm = min(REDLINE_RPM, rpm + self._noise(tick, 2, 8.0))
+        # Rider's wrist wobble; added after the shift decision so it can't cause gear hunting
+        throttle = min(1.0, max(0.0, throttle + self._noise(tick, 1, 0.01)))
+
+        load = min(100.0, max(8.0, 100.0 * throttle * (0.55 + 0.45 * min(rpm / 6000.0, 1.0))))
+        map_kpa = 28.0 + 72.0 * throttle
+
+        # Warm-up: exponential approach to the thermostat, a little above it when working hard
+        coolant = THERMOSTAT_C + (AMBIENT_C - THERMOSTAT_C) * math.exp(-t / WARMUP_TAU_S) + 4.0 * throttle
+        # Intake air heat-soaks when slow and is cooled by airflow at speed
+        intake = AMBIENT_C + (coolant - AMBIENT_C) * 0.25 / (1.0 + speed / 30.0) + self._noise(tick, 3, 0.2)
+
+        # Battery: charges towards the regulator voltage once the alternator is above idle
+        charge = 1.0 - math.exp(-t / CHARGE_TAU_S)
+        alternator = min(1.0, max(0.0, (rpm - 900.0) / 1600.0))
+        voltage = BATTERY_REST_V + (REGULATOR_V - BATTERY_REST_V) * alternator * (0.6 + 0.4 * charge)
+        voltage += self._noise(tick, 4, 0.03)
+
+        return {
+            't': t, 'speed': speed, 'throttle': throttle * 100.0, 'gear': gear, 'rpm': rpm,
+            'load': load, 'map': map_kpa, 'coolant': coolant, 'intake': intake, 'voltage': voltage,
+        }
+
+    def evaluate_batch(self, times):
+        """Vectorized `sample` for an array of simulated times; returns {field: ndarray}.
+
+        Gives the same values as calling `sample` at each time. Requires NumPy.
+        """
+        if np is None:
+            raise RuntimeError("VehicleModel.evaluate_batch requires NumPy (pip install numpy).")
+        tick = (np.asarray(times, dtype=np.float64) / TICK_S).astype(np.int64)
+        t = tick * TICK_S
+        key_times = np.asarray(self.times)
+        key_speeds = np.asarray(self.speeds)
+        noise = np.asarray(self.noise)
+
+        def noise_for(channel, scale):
+            return noise[(tick * 7 + channel * 613) % NOISE_TABLE_SIZE] * scale
+
+        c = t % self.period
+        i = np.searchsorted(key_times, c, side='right') - 1
+        t0, t1 = key_times[i], key_times[i + 1]
+        v0, v1 = key_speeds[i], key_speeds[i + 1]
+        slope = (v1 - v0) / (t1 - t0)
+        speed = np.maximum(0.0, v0 + slope * (c - t0))
+        accel = slope / 3.6
+
+        throttle = np.where(accel < -0.2, 0.0,
+                            np.minimum(1.0, 0.06 + 0.22 * np.maximum(accel, 0.0) + 0.000035 * speed * speed))
+
+        wheel_rpm = speed / 3.6 / WHEEL_CIRCUMFERENCE_M * 60.0
+        upshift = 3500 + 4500 * throttle
+        # Ratios fall with each gear, so the gear is 1 + the number of gears still above the shift point
+        gear = np.ones_like(tick)
+        for g in range(1, len(GEAR_RATIOS) - 1):
+            gear += (gear == g) & (wheel_rpm * GEAR_RATIOS[g] > upshift)
+        gear = np.where(speed < 8.0, np.where(accel > 0, 1, 0), gear)
+        ratio = np.asarray(GEAR_RATIOS)[gear]
+        rpm = np.where(gear == 0, float(IDLE_RPM), np.maximum(wheel_rpm * ratio, IDLE_RPM + 2500 * throttle))
+        rpm = np.minimum(REDLINE_RPM, rpm + noise_for(2, 8.0))
+        throttle = np.clip(throttle + noise_for(1, 0.01), 0.0, 1.0)
+
+        load = np.clip(100.0 * throttle * (0.55 + 0.45 * np.minimum(rpm / 6000.0, 1.0)), 8.0, 100.0)
+        map_kpa = 28.0 + 72.0 * throttle
+        coolant = THERMOSTAT_C + (AMBIENT_C - THERMOSTAT_C) * np.exp(-t / WARMUP_TAU_S) + 4.0 * throttle
+        intake = AMBIENT_C + (coolant - AMBIENT_C) * 0.25 / (1.0 + speed / 30.0) + noise_for(3, 0.2)
+        charge = 1.0 - np.exp(-t / CHARGE_TAU_S)
+        alternator = np.clip((rpm - 900.0) / 1600.0, 0.0, 1.0)
+        voltage = BATTERY_REST_V + (REGULATOR_V - BATTERY_REST_V) * alternator * (0.6 + 0.4 * charge)
+        voltage = voltage + noise_for(4, 0.03)
+
+        return {
+            't': t, 'speed': speed, 'throttle': throttle * 100.0, 'gear': gear, 'rpm': rpm,
+            'load': load, 'map': map_kpa, 'coolant': coolant, 'intake': intake, 'voltage': voltage,
+        }